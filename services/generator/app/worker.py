@@ -200,6 +200,8 @@ def upload_hls_to_spaces(s3_client, hls_dir: str, video_id: str) -> dict:
             content_types = {
                 ".m3u8": "application/vnd.apple.mpegurl",
                 ".ts": "video/mp2t",
+                ".m4s": "video/iso.segment",
+                ".mp4": "video/mp4",
                 ".jpg": "image/jpeg",
                 ".png": "image/png",
             }
@@ -335,7 +335,7 @@ def generate_video_from_text(job_description: str, output_path: str, output_name
             print(f"  `-- hls/{output_name}/")
             print(f"      |-- master.m3u8")
             print(f"      |-- poster.jpg")
-            print(f"      `-- 720p/ (with .ts segments)")
+            print(f"      `-- 720p/ (with init.mp4 and .m4s segments)")
         
         # Extract the actual master.m3u8 path
         final_video_path = hls_dst / "master.m3u8"
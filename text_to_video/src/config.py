@@ -17,6 +17,8 @@ ASSETS_DIR = PROJECT_ROOT / "assets"
 CHARACTERS_DIR = ASSETS_DIR / "characters"
 BACKGROUNDS_DIR = ASSETS_DIR / "backgrounds"
 CACHE_DIR = PROJECT_ROOT / "cache"
+# Whisper word timestamps, named by audio content hash and shared by all topics
+TIMESTAMP_CACHE_DIR = CACHE_DIR / "timestamps"
 
 # Debug: print paths on import (helps diagnose Docker path issues)
 print(f"[CONFIG] PROJECT_ROOT: {PROJECT_ROOT}")
@@ -186,6 +188,9 @@ VIDEO_WIDTH = 540
 VIDEO_HEIGHT = 960  # 9:16 aspect ratio for shorts
 VIDEO_FPS = 24
 VIDEO_DURATION_TARGET = 30  # Target 5 minutes max
+# H.264 encoder: "auto" picks the first working hardware encoder
+# (h264_nvenc, h264_qsv, h264_videotoolbox) and falls back to libx264
+VIDEO_ENCODER = os.getenv("VIDEO_ENCODER", "auto").lower()
 
 # Caption Configuration
 CAPTION_FONT_SIZE = 50  # Reduced from 110 for smaller captions
@@ -243,5 +248,10 @@ AVAILABLE_EMOTIONS = [
 ]
 
 
+# Whisper Configuration
+# "auto" runs Whisper on CUDA with FP16 weights when a GPU is available,
+# "cpu" forces CPU inference
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "auto").lower()
+
 # Gemini Configuration
 DEFAULT_MODEL = "gemini-3-flash-preview"
@@ -5,6 +5,8 @@ from pathlib import Path
 from typing import Dict, List
 import aiohttp
 
+from utils.text_processing import strip_emotion_markers
+
 # Handle nested event loops (when called from FastAPI/async context)
 try:
     import nest_asyncio
@@ -244,6 +246,7 @@ class TTSGenerator:
             audio_files.append({
                 "character": result["character"],
                 "text": result["text"],
+                "text_clean": strip_emotion_markers(result["text"]),
                 "images": data["images"],
                 "audio_path": result["audio_path"],
                 "line_index": result["line_index"]
@@ -1,8 +1,14 @@
 """Caching utilities for scripts, audio, and timestamps."""
 
 import json
+import os
+import shutil
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+
+# Parsed timestamp caches keyed by file name (the audio content hash),
+# invalidated when the file's mtime changes
+_timestamp_cache_memo: Dict[str, Tuple[int, list]] = {}
 
 
 def load_script_cache(cache_path: Path) -> Optional[Dict]:
@@ -32,10 +38,19 @@ def check_audio_cache(cache_path: Path) -> Optional[Path]:
 
 def load_timestamp_cache(cache_path: Path) -> Optional[list]:
     """Load timestamp cache if it exists."""
-    if cache_path.exists():
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return None
+    try:
+        mtime_ns = cache_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    memo = _timestamp_cache_memo.get(cache_path.name)
+    if memo is not None and memo[0] == mtime_ns:
+        return memo[1]
+
+    with open(cache_path, 'r', encoding='utf-8') as f:
+        timestamps = json.load(f)
+    _timestamp_cache_memo[cache_path.name] = (mtime_ns, timestamps)
+    return timestamps
 
 
 def save_timestamp_cache(cache_path: Path, timestamps: list):
@@ -43,4 +58,23 @@ def save_timestamp_cache(cache_path: Path, timestamps: list):
     cache_path.parent.mkdir(parents=True, exist_ok=True)
     with open(cache_path, 'w', encoding='utf-8') as f:
         json.dump(timestamps, f, indent=2)
+    _timestamp_cache_memo[cache_path.name] = (cache_path.stat().st_mtime_ns, timestamps)
+
+
+
+def link_file(source: Path, target: Path):
+    """Hard-link a file to target, copying when the filesystem cannot link."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.unlink(missing_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
 
+def link_tree(source_dir: Path, target_dir: Path):
+    """Mirror a directory tree into target_dir with link_file."""
+    for root, _, files in os.walk(source_dir):
+        root = Path(root)
+        for name in files:
+            link_file(root / name, target_dir / root.relative_to(source_dir) / name)
@@ -1,7 +1,41 @@
 """Media utilities for FFmpeg and duration calculations."""
 
+import os
+import selectors
+import signal
 import subprocess
+import threading
+import time
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
+from typing import List, Tuple
+
+# mutagen is optional - without it durations come from ffprobe
+try:
+    import mutagen
+    MUTAGEN_AVAILABLE = True
+except ImportError:
+    mutagen = None
+    MUTAGEN_AVAILABLE = False
+
+from config import VIDEO_ENCODER
+
+# Hardware H.264 encoders in order of preference
+HARDWARE_H264_ENCODERS = ('h264_nvenc', 'h264_qsv', 'h264_videotoolbox')
+
+# Filter graph worker threads; FFmpeg runs filter graphs single-threaded by
+# default, and overlay/scale/subtitle chains scale well up to ~8 threads
+FILTER_THREADS = str(os.cpu_count() or 1)
+
+# Seconds between progress lines while FFmpeg renders
+PROGRESS_INTERVAL = 1.0
+
+# Pipe buffer and read size for FFmpeg's stdout/stderr
+PIPE_BUFFER_SIZE = 1024 * 1024
+
+# Seconds FFmpeg gets to exit after SIGTERM before it is killed
+TERMINATE_TIMEOUT = 5.0
 
 
 def check_ffmpeg() -> bool:
@@ -13,29 +47,228 @@ def check_ffmpeg() -> bool:
         return False
 
 
-def get_audio_duration(audio_path: Path) -> float:
+def _encoder_works(encoder: str) -> bool:
+    """Encode a single test frame to confirm the encoder has usable hardware."""
+    cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', 'color=black:s=256x256:d=0.1',
+        '-frames:v', '1',
+        '-c:v', encoder,
+        '-f', 'null', '-'
+    ]
+    try:
+        subprocess.run(cmd, capture_output=True, check=True, timeout=30)
+        return True
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+        return False
+
+
+@lru_cache(maxsize=1)
+def get_h264_encoder() -> str:
+    """
+    Pick the H.264 encoder for renders, probing FFmpeg once per process.
+    
+    Returns:
+        VIDEO_ENCODER if set explicitly, otherwise the first hardware encoder
+        that FFmpeg lists and can open, falling back to libx264
+    """
+    if VIDEO_ENCODER != "auto":
+        return VIDEO_ENCODER
+    
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-encoders'],
+            capture_output=True, text=True, check=True
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return 'libx264'
+    
+    # A listed encoder may still lack a GPU/driver, so test-encode it
+    listed = set(line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1)
+    for encoder in HARDWARE_H264_ENCODERS:
+        if encoder in listed and _encoder_works(encoder):
+            print(f"Using hardware video encoder: {encoder}")
+            return encoder
+    return 'libx264'
+
+
+def get_h264_encoder_args(crf: int = 23) -> List[str]:
     """
-    Get duration of an audio file using FFprobe.
+    Get FFmpeg video codec arguments for the detected H.264 encoder.
     
     Args:
-        audio_path: Path to audio file
+        crf: Constant-quality target (libx264 CRF scale; mapped to the
+             equivalent rate control of hardware encoders)
         
     Returns:
-        Duration in seconds
+        List of FFmpeg arguments starting with -c:v
+    """
+    encoder = get_h264_encoder()
+    if encoder == 'h264_nvenc':
+        return ['-c:v', 'h264_nvenc', '-preset', 'p4', '-tune', 'hq',
+                '-rc', 'vbr', '-cq', str(crf), '-b:v', '0']
+    if encoder == 'h264_qsv':
+        return ['-c:v', 'h264_qsv', '-preset', 'medium', '-global_quality', str(crf)]
+    if encoder == 'h264_videotoolbox':
+        # VideoToolbox has no constant-quality mode on all Macs
+        return ['-c:v', 'h264_videotoolbox', '-b:v', '3M']
+    return ['-c:v', encoder, '-preset', 'medium', '-crf', str(crf)]
+
+
+def _progress_seconds(progress: dict) -> float:
+    """Read the rendered timestamp from an FFmpeg -progress block."""
+    # out_time_ms is in microseconds as well (long-standing FFmpeg quirk)
+    for key in ('out_time_us', 'out_time_ms'):
+        try:
+            return int(progress[key]) / 1_000_000
+        except (KeyError, ValueError):
+            continue
+    return 0.0
+
+
+def _iter_output_lines(proc: subprocess.Popen, stderr_tail: deque):
+    """
+    Yield proc's stdout lines while collecting its stderr lines into stderr_tail.
+    
+    On POSIX both pipes are non-blocking and multiplexed with a selector, so
+    neither can fill up and stall FFmpeg; Windows cannot select on pipes, so
+    stderr is drained on a background thread there.
+    """
+    if os.name == 'nt':
+        drain = threading.Thread(
+            target=stderr_tail.extend,
+            args=(raw.decode('utf-8', errors='replace') for raw in proc.stderr),
+            daemon=True
+        )
+        drain.start()
+        for raw in proc.stdout:
+            yield raw.decode('utf-8', errors='replace')
+        drain.join()
+        return
+    
+    pending = {proc.stdout.fileno(): b'', proc.stderr.fileno(): b''}
+    with selectors.DefaultSelector() as selector:
+        for stream in (proc.stdout, proc.stderr):
+            os.set_blocking(stream.fileno(), False)
+            selector.register(stream.fileno(), selectors.EVENT_READ)
+        while selector.get_map():
+            for key, _ in selector.select():
+                fd = key.fd
+                chunk = os.read(fd, PIPE_BUFFER_SIZE)
+                if not chunk:
+                    selector.unregister(fd)
+                    lines = [pending[fd]] if pending[fd] else []
+                else:
+                    *lines, pending[fd] = (pending[fd] + chunk).split(b'\n')
+                for raw in lines:
+                    line = raw.decode('utf-8', errors='replace') + '\n'
+                    if fd == proc.stderr.fileno():
+                        stderr_tail.append(line)
+                    else:
+                        yield line
+
+
+def _terminate_process_group(proc: subprocess.Popen):
+    """Stop FFmpeg and anything it spawned, escalating to a kill if it lingers."""
+    try:
+        if os.name == 'nt':
+            proc.terminate()
+        else:
+            os.killpg(proc.pid, signal.SIGTERM)
+    except (ProcessLookupError, OSError):
+        pass
+    try:
+        proc.wait(timeout=TERMINATE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def run_ffmpeg_with_progress(
+    cmd: List[str],
+    total_duration: float,
+    stdin=None
+) -> Tuple[int, str]:
+    """
+    Run an FFmpeg command, printing render progress as it streams in.
+    
+    FFmpeg writes key=value progress blocks to stdout; only the last lines of
+    stderr are kept for error reporting. FFmpeg runs in its own session, so a
+    Ctrl-C here terminates its whole process group instead of orphaning it.
+    
+    Args:
+        cmd: FFmpeg command list (starting with 'ffmpeg')
+        total_duration: Expected output duration in seconds, for percentages
+        stdin: Optional pipe FFmpeg reads as 'pipe:0'; the parent's copy is
+               closed once FFmpeg has it, so the writer sees EOF/EPIPE
         
-    Raises:
-        FileNotFoundError: If audio file doesn't exist
-        RuntimeError: If FFprobe fails or returns invalid duration
+    Returns:
+        Tuple of (return_code, stderr_tail)
     """
-    if not audio_path.exists():
-        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+    cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', '-loglevel', 'error', *cmd[1:]]
+    try:
+        proc = subprocess.Popen(
+            cmd,
+            stdin=stdin,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=PIPE_BUFFER_SIZE,
+            close_fds=True,
+            start_new_session=True
+        )
+    finally:
+        # Closed even when FFmpeg fails to start, so the pipe never leaks
+        if stdin is not None:
+            stdin.close()
+    
+    stderr_tail = deque(maxlen=500)
+    progress = {}
+    last_report = 0.0
+    try:
+        for line in _iter_output_lines(proc, stderr_tail):
+            key, _, value = line.strip().partition('=')
+            progress[key] = value
+            # Each block ends with progress=continue or progress=end
+            if key != 'progress':
+                continue
+            now = time.monotonic()
+            if value != 'end' and now - last_report < PROGRESS_INTERVAL:
+                continue
+            last_report = now
+            rendered = _progress_seconds(progress)
+            percent = min(100.0, rendered / total_duration * 100) if total_duration > 0 else 0.0
+            print(f"  Progress: {percent:5.1f}% ({rendered:.1f}s / {total_duration:.1f}s)"
+                  f" frame={progress.get('frame', '?')} speed={progress.get('speed', '?').strip()}")
+        returncode = proc.wait()
+    except BaseException:
+        # Ctrl-C reaches only this process; FFmpeg is in its own session
+        _terminate_process_group(proc)
+        raise
+    finally:
+        proc.stdout.close()
+        proc.stderr.close()
+    
+    return returncode, ''.join(stderr_tail)
+
+
+@lru_cache(maxsize=1024)
+def _probe_audio_duration(path: str, mtime_ns: int, size: int) -> float:
+    """Read an audio file's duration; mtime and size key the memo."""
+    # Header read avoids spawning a process per clip
+    if MUTAGEN_AVAILABLE:
+        try:
+            info = mutagen.File(path)
+            if info is not None and info.info.length > 0:
+                return float(info.info.length)
+        except Exception:
+            pass
     
     cmd = [
         'ffprobe',
         '-v', 'error',
         '-show_entries', 'format=duration',
         '-of', 'default=noprint_wrappers=1:nokey=1',
-        str(audio_path)
+        path
     ]
     result = subprocess.run(cmd, capture_output=True, text=True, check=True)
     
@@ -45,7 +278,32 @@ def get_audio_duration(audio_path: Path) -> float:
             raise ValueError(f"Invalid duration: {duration}")
         return duration
     except (ValueError, AttributeError) as e:
-        raise RuntimeError(f"Failed to get duration for {audio_path}: {e}")
+        raise RuntimeError(f"Failed to get duration for {path}: {e}")
+
+
+def get_audio_duration(audio_path: Path) -> float:
+    """
+    Get duration of an audio file from its headers (mutagen) or FFprobe.
+    
+    Results are memoized per file version, so the subtitle, timing and
+    render steps share one probe per clip.
+    
+    Args:
+        audio_path: Path to audio file
+        
+    Returns:
+        Duration in seconds
+        
+    Raises:
+        FileNotFoundError: If audio file doesn't exist
+        RuntimeError: If FFprobe fails or returns invalid duration
+    """
+    try:
+        stat = Path(audio_path).stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+    
+    return _probe_audio_duration(str(audio_path), stat.st_mtime_ns, stat.st_size)
 
 
 def get_video_duration(video_path: Path) -> float:
@@ -1,9 +1,11 @@
 """Text processing utilities for emotion markers and sentence splitting."""
 
 import re
-from typing import List
+from functools import lru_cache
+from typing import Dict, List
 
 
+@lru_cache(maxsize=4096)
 def strip_emotion_markers(text: str) -> str:
     """
     Remove Fish Audio emotion markers from text.
@@ -22,6 +24,25 @@ def strip_emotion_markers(text: str) -> str:
     return text
 
 
+def get_clean_text(audio_info: Dict) -> str:
+    """
+    Get the marker-free text for an audio info dict.
+    
+    Uses the 'text_clean' value stored by the producer when present, so the
+    stripping runs once per line rather than once per consumer.
+    
+    Args:
+        audio_info: Audio info dict with 'text' and optionally 'text_clean'
+        
+    Returns:
+        Text with emotion markers removed
+    """
+    text_clean = audio_info.get("text_clean")
+    if text_clean is None:
+        text_clean = strip_emotion_markers(audio_info.get("text", ""))
+    return text_clean
+
+
 def strip_image_names_from_text(text: str) -> str:
     """
     Remove image names that were incorrectly placed in text.
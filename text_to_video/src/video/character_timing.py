@@ -4,7 +4,7 @@ from pathlib import Path
 from typing import Dict, List, Tuple
 
 from config import CHARACTERS_DIR
-from utils.text_processing import strip_emotion_markers, split_into_sentences
+from utils.text_processing import get_clean_text, split_into_sentences
 from utils.media_utils import get_audio_duration
 
 
@@ -91,8 +91,8 @@ class CharacterTimingCalculator:
             sentences = split_into_sentences(text)
             
             # Get word timestamps for this audio file to determine sentence timing
-            text_for_display = strip_emotion_markers(text)
-            timestamp_cache = output_dir / f"{audio_info['audio_path'].stem}_timestamps.json"
+            text_for_display = get_clean_text(audio_info)
+            timestamp_cache = self.transcriber.get_cache_path(audio_info["audio_path"], output_dir)
             word_timings = self.transcriber.get_word_timestamps(
                 audio_info["audio_path"], text_for_display, timestamp_cache
             )
@@ -1,10 +1,21 @@
 """FFmpeg command building for video composition."""
 
+import hashlib
+import os
 import random
 import subprocess
 from pathlib import Path
 from typing import Dict, List, Tuple
 
+# Pillow is optional - without it each character image is its own overlay
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = None
+    ImageOps = None
+    PIL_AVAILABLE = False
+
 from config import (
     VIDEO_WIDTH,
     VIDEO_HEIGHT,
@@ -16,21 +27,46 @@ from config import (
     BACKGROUNDS_DIR,
     PROJECT_ROOT,
 )
-from utils.media_utils import get_video_duration
+from utils.media_utils import get_video_duration, get_h264_encoder_args
+
+# Backgrounds transcoded to the output size and frame rate, reused across renders
+BACKGROUND_CACHE_DIR = BACKGROUNDS_DIR / "_cache"
+
+BACKGROUND_EXTENSIONS = (".mp4", ".mov", ".avi")
+
+# Where concatenate_audio's FFmpeg writes its errors, and how much of the
+# end of that log a failed render reports
+CONCAT_STDERR_LOG = "concat_stderr.log"
+CONCAT_STDERR_TAIL = 4096
 
 
 class FFmpegCommandBuilder:
     """Builds FFmpeg commands for video composition."""
 
     def __init__(self):
-        pass
+        # Background listing, rescanned only when the directory's mtime changes
+        self._bg_cache: List[Path] = []
+        self._bg_cache_mtime = None
+
+    def _list_background_videos(self) -> List[Path]:
+        """List background videos, reusing the last scan while the directory is unchanged."""
+        try:
+            mtime = os.stat(BACKGROUNDS_DIR).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if mtime != self._bg_cache_mtime:
+            with os.scandir(BACKGROUNDS_DIR) as entries:
+                self._bg_cache = sorted(
+                    Path(entry.path) for entry in entries
+                    if entry.name.endswith(BACKGROUND_EXTENSIONS) and entry.is_file()
+                )
+            self._bg_cache_mtime = mtime
+        return self._bg_cache
 
     def get_background_video(self, duration: float = 60.0) -> Path:
         """Find and randomly select a background video file, or generate a solid color background."""
         print(f"[BACKGROUND] Searching in: {BACKGROUNDS_DIR}")
-        video_files = list(BACKGROUNDS_DIR.glob("*.mp4")) + \
-                     list(BACKGROUNDS_DIR.glob("*.mov")) + \
-                     list(BACKGROUNDS_DIR.glob("*.avi"))
+        video_files = self._list_background_videos()
         
         print(f"[BACKGROUND] Found {len(video_files)} video files")
 
@@ -69,10 +105,60 @@ class FFmpegCommandBuilder:
         
         return background_path
 
-    def concatenate_audio(self, audio_files: List[Dict], output_dir: Path) -> Path:
-        """Concatenate all audio files into one with volume normalization."""
+    def get_or_build_bg_cache(self, source: Path) -> Path:
+        """
+        Get a copy of a background video already scaled, cropped and resampled
+        to the output size and frame rate, transcoding it on first use.
+        
+        The cache file is keyed by the source's path, mtime and size plus the
+        target geometry, so editing a clip or the video settings rebuilds it.
+        
+        Args:
+            source: Path to the source background video
+            
+        Returns:
+            Path to the cached background, or the source if transcoding fails
+        """
+        stat = source.stat()
+        key = f"{source.resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{VIDEO_WIDTH}|{VIDEO_HEIGHT}|{VIDEO_FPS}"
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+        cached = BACKGROUND_CACHE_DIR / f"{digest}_{VIDEO_WIDTH}x{VIDEO_HEIGHT}_{VIDEO_FPS}.mp4"
+        if cached.exists():
+            return cached
+        
+        print(f"[BACKGROUND] Pre-scaling {source.name} for reuse (one-time)...")
+        BACKGROUND_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Write next to the final name and rename, so an interrupted
+        # transcode never leaves a truncated cache entry
+        partial = cached.with_name(f"{cached.stem}.partial.mp4")
+        cmd = [
+            'ffmpeg',
+            '-i', str(source),
+            '-vf', f"scale={VIDEO_WIDTH}:{VIDEO_HEIGHT}:force_original_aspect_ratio=increase,"
+                   f"crop={VIDEO_WIDTH}:{VIDEO_HEIGHT},fps={VIDEO_FPS},format=yuv420p",
+            *get_h264_encoder_args(crf=18),
+            '-an',
+            '-y',
+            str(partial)
+        ]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            print(f"Warning: Could not pre-scale background ({e.stderr.decode(errors='replace')[-500:]})")
+            partial.unlink(missing_ok=True)
+            return source
+        os.replace(partial, cached)
+        return cached
+
+    def concatenate_audio(self, audio_files: List[Dict], output_dir: Path) -> subprocess.Popen:
+        """
+        Start an FFmpeg process that streams all audio files concatenated.
+        
+        The audio is never written to disk: the returned process writes PCM in
+        a NUT container to its stdout, which the render reads as 'pipe:0'.
+        Its errors go to a log in output_dir; see concat_error_tail.
+        """
         concat_file = output_dir / "concat_list.txt"
-        audio_output = output_dir / "full_audio.m4a"
 
         # Validate input
         if not audio_files:
@@ -135,33 +221,61 @@ class FFmpegCommandBuilder:
             print(f"audio_files type: {type(audio_files)}, length: {len(audio_files) if audio_files else 0}")
             raise RuntimeError(f"Failed to create concat file: {e}")
 
-        # Concatenate audio files and re-encode to AAC in M4A container
-        # M4A/AAC avoids MP3 frame boundary issues and is compatible with MP4 muxing
+        # Decode and concatenate to PCM; the render does the only AAC encode
+        # NUT is streamable and carries the sample format, so the render
+        # needs no input options to read it from a pipe
         # Note: Removed loudnorm filter for speed - Fish Audio TTS already has consistent volume
         cmd = [
             'ffmpeg',
+            '-nostdin',
+            '-loglevel', 'error',
             '-f', 'concat',
             '-safe', '0',
             '-i', str(concat_file),
-            '-c:a', 'aac',      # AAC codec
-            '-b:a', '192k',     # Bitrate
-            '-y',               # Overwrite output
-            str(audio_output)
+            '-c:a', 'pcm_s16le',
+            '-f', 'nut',
+            'pipe:1'
         ]
 
+        # A file instead of a pipe: nothing has to drain it while the render
+        # reads stdout, and -loglevel error keeps it small
+        with open(output_dir / CONCAT_STDERR_LOG, 'wb') as stderr_log:
+            return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_log)
+
+    def concat_error_tail(self, output_dir: Path) -> str:
+        """Last CONCAT_STDERR_TAIL bytes of a concatenate_audio process's errors."""
         try:
-            result = subprocess.run(cmd, capture_output=True, check=True, text=True)
-        except subprocess.CalledProcessError as e:
-            # Print the actual error message from ffmpeg
-            error_msg = e.stderr if e.stderr else "No error message available"
-            print(f"FFmpeg error output: {error_msg}")
-            print(f"FFmpeg command: {' '.join(cmd)}")
-            print(f"Concat file contents:")
-            with open(concat_file, 'r', encoding='utf-8') as f:
-                print(f.read())
-            raise
+            with open(output_dir / CONCAT_STDERR_LOG, 'rb') as f:
+                f.seek(max(0, os.fstat(f.fileno()).st_size - CONCAT_STDERR_TAIL))
+                return f.read().decode('utf-8', errors='replace').strip()
+        except OSError:
+            return ''
+
+    def write_filter_script(self, filter_complex: str, filter_file: Path) -> Path:
+        """
+        Write the filter graph for -filter_complex_script, skipping the write
+        when the file already holds the same graph.
         
-        return audio_output
+        A blake2b digest of the graph is kept next to the script in a .sha file.
+        
+        Args:
+            filter_complex: Filter complex string
+            filter_file: Path to write the script to
+            
+        Returns:
+            Path to the filter script
+        """
+        data = filter_complex.encode('utf-8')
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        sha_file = filter_file.with_name(filter_file.name + ".sha")
+        try:
+            if filter_file.exists() and sha_file.read_text(encoding='ascii') == digest:
+                return filter_file
+        except FileNotFoundError:
+            pass
+        filter_file.write_bytes(data)
+        sha_file.write_text(digest, encoding='ascii')
+        return filter_file
 
     def build_enable_expr_for_image(self, image_times: List[Tuple[float, float]]) -> str:
         """
@@ -182,14 +296,97 @@ class FFmpegCommandBuilder:
 
         return "+".join(conditions)
 
+    def _build_sprite_overlays(
+        self,
+        character_image_times: Dict[str, Dict[str, List[Tuple[float, float]]]],
+        character_image_paths: Dict[str, Dict[str, Path]],
+        char_positions: Dict[str, int],
+        sprite_dir: Path
+    ) -> List[Tuple[Path, int, str]]:
+        """
+        Pre-composite the character images visible together into one sprite
+        per distinct combination, so each frame blends one overlay instead of
+        one per character image.
+        
+        Args:
+            character_image_times: Dict[character_name][image_name] -> list of (start, end) tuples
+            character_image_paths: Dict[character_name][image_name] -> Path
+            char_positions: Lowercase character name -> X position
+            sprite_dir: Directory to write the sprite PNGs to
+            
+        Returns:
+            List of (sprite_path, x, enable_expr) in stacking order
+        """
+        char_width, char_height = CHARACTER_SIZE
+        
+        # Stacking order matches the per-image overlay chain
+        layers = []
+        for character in character_image_times.keys():
+            for image in sorted(character_image_times[character].keys()):
+                ranges = character_image_times[character][image]
+                if ranges:
+                    layers.append((character, image, ranges))
+        if not layers:
+            return []
+        
+        # Split the timeline at every boundary and record which layers are
+        # visible in each piece, merging neighbours with the same set
+        boundaries = sorted({t for _, _, ranges in layers for r in ranges for t in r})
+        combos: Dict[Tuple[int, ...], List[List[float]]] = {}
+        previous = None
+        for start, end in zip(boundaries, boundaries[1:]):
+            mid = (start + end) / 2
+            visible = tuple(
+                i for i, (_, _, ranges) in enumerate(layers)
+                if any(s <= mid <= e for s, e in ranges)
+            )
+            if not visible:
+                previous = None
+                continue
+            if visible == previous:
+                combos[visible][-1][1] = end
+            else:
+                combos.setdefault(visible, []).append([start, end])
+            previous = visible
+        
+        # Load each image once, scaled up or down to fit the character box
+        # (like scale's force_original_aspect_ratio=decrease) and centred
+        layer_images = []
+        for character, image, _ in layers:
+            with Image.open(character_image_paths[character][image]) as source:
+                source = source.convert("RGBA")
+                source = ImageOps.contain(source, (char_width, char_height), Image.BICUBIC)
+                boxed = Image.new("RGBA", (char_width, char_height), (0, 0, 0, 0))
+                boxed.paste(source, ((char_width - source.width) // 2, (char_height - source.height) // 2))
+            layer_images.append(boxed)
+        
+        sprite_dir.mkdir(parents=True, exist_ok=True)
+        sprites = []
+        for combo_index, (visible, intervals) in enumerate(combos.items()):
+            # Crop the sprite to the horizontal span of its characters
+            xs = [char_positions[layers[i][0].lower()] for i in visible]
+            left = min(xs)
+            sprite = Image.new("RGBA", (max(xs) + char_width - left, char_height), (0, 0, 0, 0))
+            for i, x in zip(visible, xs):
+                sprite.alpha_composite(layer_images[i], (x - left, 0))
+            sprite_path = sprite_dir / f"sprite_{combo_index:03d}.png"
+            sprite.save(sprite_path, compress_level=1)
+            sprites.append((sprite_path, left, self.build_enable_expr_for_image(intervals)))
+        
+        return sprites
+
     def build_filter_complex(
         self,
         subtitle_path: Path,
         character_image_times: Dict[str, Dict[str, List[Tuple[float, float]]]],
         character_image_paths: Dict[str, Dict[str, Path]],
         audio_files: List[Dict] = None,
-        character_group_name: str = None
-    ) -> str:
+        character_group_name: str = None,
+        by_character: Dict[str, List[Dict]] = None,
+        background_prescaled: bool = False,
+        sprite_dir: Path = None,
+        poster_time: float = None
+    ) -> Tuple[str, str]:
         """
         Build FFmpeg filter_complex string for video composition with DYNAMIC characters.
         
@@ -198,9 +395,22 @@ class FFmpegCommandBuilder:
             character_image_times: Dict[character_name][image_name] -> list of (start, end) tuples
             character_image_paths: Dict[character_name][image_name] -> Path
             audio_files: Optional list of audio file dicts to determine character speaking order
+            character_group_name: Optional character group, selects the image tint
+            by_character: Optional index from index_audio_files; used instead of
+                scanning audio_files for the speaking order
+            background_prescaled: True if the background is already at the output
+                size and frame rate (see get_or_build_bg_cache)
+            sprite_dir: Optional directory for pre-composited character sprites;
+                when given (and Pillow is installed) each combination of visible
+                images is a single overlay
+            poster_time: Optional time in seconds; adds a [poster] output pad
+                carrying the finished frames from that time on
             
         Returns:
-            Filter complex string for FFmpeg
+            Tuple of (simple_vf, complex_graph); exactly one is non-empty.
+            simple_vf is a single unlabeled chain for -vf, used when there are
+            no character overlays; otherwise complex_graph is a -filter_complex
+            graph whose output pad is [v]
         """
         # Calculate positions: Characters positioned based on speaking order
         char_width, char_height = CHARACTER_SIZE
@@ -211,14 +421,18 @@ class FFmpegCommandBuilder:
         num_characters = len(characters)
         
         # Determine character order based on first appearance in audio_files
+        # (by_character is already keyed in that order)
+        if by_character is not None:
+            speakers = by_character.keys()
+        else:
+            speakers = (audio_info.get("character", "") for audio_info in audio_files or [])
         character_order = []
-        if audio_files:
-            seen = set()
-            for audio_info in audio_files:
-                char = audio_info.get("character", "").lower()
-                if char and char not in seen:
-                    character_order.append(char)
-                    seen.add(char)
+        seen = set()
+        for char in speakers:
+            char = char.lower()
+            if char and char not in seen:
+                character_order.append(char)
+                seen.add(char)
         
         # If we couldn't determine order from audio_files, use sorted order as fallback
         if not character_order or len(character_order) != num_characters:
@@ -256,65 +470,100 @@ class FFmpegCommandBuilder:
             for i, char in enumerate(character_order):
                 char_positions[char] = int(CHARACTER_EDGE_MARGIN + i * spacing)
         
-        # Start building filter complex
-        filter_parts = [
-            f"[0:v]scale={VIDEO_WIDTH}:{VIDEO_HEIGHT}:force_original_aspect_ratio=increase,"
+        # Start building filter complex; a pre-scaled background feeds the
+        # first overlay directly
+        background_chain = (
+            f"scale={VIDEO_WIDTH}:{VIDEO_HEIGHT}:force_original_aspect_ratio=increase,"
             f"crop={VIDEO_WIDTH}:{VIDEO_HEIGHT},"
-            f"fps={VIDEO_FPS}[bg];"
-        ]
+            f"fps={VIDEO_FPS}"
+        )
+        if background_prescaled:
+            filter_parts = []
+            current_pad = "0:v"
+        else:
+            filter_parts = [f"[0:v]{background_chain}[bg];"]
+            current_pad = "bg"
 
         # Convert subtitle path for FFmpeg (escape special characters)
         subtitle_path_unix = str(subtitle_path).replace('\\', '/').replace(':', '\\\\:')
 
         # Get color tint for this character group
         group_color = CHARACTER_GROUP_COLORS.get(character_group_name, None)
+        tint_filter = ""
+        if group_color:
+            # Convert hex color to RGB values for colorbalance filter
+            # Format: #RRGGBB -> extract RGB
+            hex_color = group_color.lstrip('#')
+            r = int(hex_color[0:2], 16) / 255.0
+            g = int(hex_color[2:4], 16) / 255.0
+            b = int(hex_color[4:6], 16) / 255.0
+            # Apply subtle tint (0.1 = 10% tint, 0.2 = 20% tint)
+            tint_strength = 0.15  # 15% tint for subtle but visible distinction
+            tint_filter = f",colorbalance=rs={tint_strength * r}:gs={tint_strength * g}:bs={tint_strength * b}"
         
-        # Add movie filters and overlays for each character's images
-        current_pad = "bg"
         pad_counter = 1
         
-        for character in character_image_times.keys():
-            # Use lowercase for position lookup
-            char_x = char_positions[character.lower()]
-            char_images = character_image_times[character]
-            
-            for image in sorted(char_images.keys()):
-                image_path = str(character_image_paths[character][image]).replace('\\', '/').replace(':', '\\\\:')
-                image_enable = self.build_enable_expr_for_image(char_images[image])
+        if sprite_dir is not None and PIL_AVAILABLE:
+            # One pre-composited overlay per combination of visible images
+            sprites = self._build_sprite_overlays(
+                character_image_times, character_image_paths, char_positions, sprite_dir
+            )
+            for sprite_index, (sprite_path, sprite_x, sprite_enable) in enumerate(sprites):
+                sprite_path_unix = str(sprite_path).replace('\\', '/').replace(':', '\\\\:')
                 pad_name = f"v{pad_counter}"
-                
-                # Scale all characters to EXACT same size to ensure centers align
-                # force_original_aspect_ratio=decrease ensures they fit within bounds
-                # Then pad to exact size if needed to maintain consistent positioning
-                scale_filter = f"movie={image_path},scale=w={char_width}:h={char_height}:force_original_aspect_ratio=decrease,"
-                scale_filter += f"pad={char_width}:{char_height}:(ow-iw)/2:(oh-ih)/2:color=0x00000000,format=rgba"
-                
-                # Apply color tint if group color is specified
-                if group_color:
-                    # Convert hex color to RGB values for colorbalance filter
-                    # Format: #RRGGBB -> extract RGB
-                    hex_color = group_color.lstrip('#')
-                    r = int(hex_color[0:2], 16) / 255.0
-                    g = int(hex_color[2:4], 16) / 255.0
-                    b = int(hex_color[4:6], 16) / 255.0
-                    # Apply subtle tint (0.1 = 10% tint, 0.2 = 20% tint)
-                    tint_strength = 0.15  # 15% tint for subtle but visible distinction
-                    scale_filter += f",colorbalance=rs={tint_strength * r}:gs={tint_strength * g}:bs={tint_strength * b}"
-                
-                scale_filter += f"[{character}_{image}];"
-                filter_parts.append(scale_filter)
-                
+                filter_parts.append(f"movie={sprite_path_unix},format=rgba{tint_filter}[sprite{sprite_index}];")
                 filter_parts.append(
-                    f"[{current_pad}][{character}_{image}]overlay={char_x}:{char_y}:enable='{image_enable}'[{pad_name}];"
+                    f"[{current_pad}][sprite{sprite_index}]overlay={sprite_x}:{char_y}:enable='{sprite_enable}'[{pad_name}];"
                 )
                 current_pad = pad_name
                 pad_counter += 1
+        else:
+            # Add movie filters and overlays for each character's images
+            for character in character_image_times.keys():
+                # Use lowercase for position lookup
+                char_x = char_positions[character.lower()]
+                char_images = character_image_times[character]
+                
+                for image in sorted(char_images.keys()):
+                    image_path = str(character_image_paths[character][image]).replace('\\', '/').replace(':', '\\\\:')
+                    image_enable = self.build_enable_expr_for_image(char_images[image])
+                    pad_name = f"v{pad_counter}"
+                    
+                    # Scale all characters to EXACT same size to ensure centers align
+                    # force_original_aspect_ratio=decrease ensures they fit within bounds
+                    # Then pad to exact size if needed to maintain consistent positioning
+                    scale_filter = f"movie={image_path},scale=w={char_width}:h={char_height}:force_original_aspect_ratio=decrease,"
+                    scale_filter += f"pad={char_width}:{char_height}:(ow-iw)/2:(oh-ih)/2:color=0x00000000,format=rgba"
+                    
+                    # Apply color tint if group color is specified
+                    scale_filter += tint_filter
+                    
+                    scale_filter += f"[{character}_{image}];"
+                    filter_parts.append(scale_filter)
+                    
+                    filter_parts.append(
+                        f"[{current_pad}][{character}_{image}]overlay={char_x}:{char_y}:enable='{image_enable}'[{pad_name}];"
+                    )
+                    current_pad = pad_name
+                    pad_counter += 1
 
         # Apply subtitles last
         # Note: libass will use system fonts - install Nunito-Black.ttf for best results
+        if poster_time is not None:
+            # Tap the finished frames for the poster so it needs no second decode
+            filter_parts.append(f"[{current_pad}]subtitles={subtitle_path_unix},split=2[v][poster_src];")
+            filter_parts.append(f"[poster_src]select='gte(t,{poster_time})'[poster]")
+            return "", "".join(filter_parts)
+
+        if pad_counter == 1:
+            # Nothing to overlay: background and subtitles form one linear chain
+            chain = [] if background_prescaled else [background_chain]
+            chain.append(f"subtitles={subtitle_path_unix}")
+            return ",".join(chain), ""
+
         filter_parts.append(f"[{current_pad}]subtitles={subtitle_path_unix}[v]")
 
-        return "".join(filter_parts)
+        return "", "".join(filter_parts)
 
     def build_ffmpeg_command(
         self,
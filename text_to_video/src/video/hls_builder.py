@@ -4,30 +4,34 @@ from pathlib import Path
 from typing import List, Tuple
 
 from config import VIDEO_FPS, VIDEO_WIDTH, VIDEO_HEIGHT
+from utils.media_utils import FILTER_THREADS, get_h264_encoder_args
 
 
 def build_hls_output(
     background_path: Path,
-    audio_path: Path,
-    filter_complex: str,
-    filter_file: Path,
+    audio_input: str,
+    filter_args: List[str],
+    video_map: str,
     random_start: float,
     total_duration: float,
     output_dir: Path,
-    title: str = "Educational Content"
+    title: str = "Educational Content",
+    poster_path: Path = None
 ) -> Tuple[List[str], Path]:
     """
     Build FFmpeg command for HLS output with proper segmenting.
     
     Args:
         background_path: Path to background video
-        audio_path: Path to concatenated audio file
-        filter_complex: Filter complex string
-        filter_file: Path to filter complex file
+        audio_input: FFmpeg input for the concatenated audio (path or 'pipe:0')
+        filter_args: Video filter arguments ('-vf ...' or '-filter_complex_script ...')
+        video_map: Stream to map as video ('0:v' for -vf, '[v]' for a filter graph)
         random_start: Random start time in background video
         total_duration: Total duration of the video
         output_dir: Directory to output HLS files
         title: Video title for metadata
+        poster_path: Optional path for a poster JPEG taken from the graph's
+            [poster] pad in the same render
         
     Returns:
         Tuple of (ffmpeg_command_list, rendition_playlist_path)
@@ -36,33 +40,44 @@ def build_hls_output(
     hls_dir = output_dir / "720p"
     hls_dir.mkdir(parents=True, exist_ok=True)
     
-    # Write filter complex to file
-    filter_file.write_text(filter_complex, encoding='utf-8')
-    
     # Calculate GOP size: 2 seconds * fps = 48 frames for 24fps
     gop_size = int(2.0 * VIDEO_FPS)
     
-    # HLS output parameters
-    segment_pattern = str(hls_dir / "seg_%03d.ts")
+    # HLS output parameters: fMP4 (CMAF) segments, no MPEG-TS packetization
+    segment_pattern = str(hls_dir / "seg_%03d.m4s")
     playlist_path = hls_dir / "index.m3u8"
     
+    # Poster output: one JPEG from the [poster] pad, encoded alongside the HLS
+    poster_args = []
+    if poster_path is not None:
+        poster_args = [
+            '-map', '[poster]',
+            '-frames:v', '1',
+            '-q:v', '3',
+            '-update', '1',
+            '-f', 'image2',
+            str(poster_path),
+        ]
+    
     # Build FFmpeg command for HLS
     cmd = [
         'ffmpeg',
+        '-filter_threads', FILTER_THREADS,
+        '-filter_complex_threads', FILTER_THREADS,
         '-ss', str(random_start),
         '-stream_loop', '-1',
         '-i', str(background_path),
-        '-i', str(audio_path),
-        '-filter_complex_script', str(filter_file),
-        '-map', '[v]',
+        '-i', audio_input,
+        *filter_args,
+        *poster_args,
+        '-map', video_map,
         '-map', '1:a',
         '-shortest',
-        # Video encoding: H.264 High profile, level 3.1-4.0
-        '-c:v', 'libx264',
+        '-threads', '0',
+        # Video encoding: H.264 High profile, level 3.1-4.0, quality 23
+        *get_h264_encoder_args(crf=23),
         '-profile:v', 'high',
         '-level', '4.0',  # Level 4.0 (can be 3.1-4.0 range)
-        '-preset', 'medium',
-        '-crf', '23',  # CRF 23 as specified
         '-maxrate', '3M',  # Optional bitrate cap: 3 Mbps
         '-bufsize', '6M',  # Buffer size: 6 Mbps
         # Keyframe settings: GOP matches segment boundaries
@@ -80,9 +95,13 @@ def build_hls_output(
         '-f', 'hls',
         '-hls_time', '2.0',  # 2-second segments
         '-hls_playlist_type', 'vod',  # VOD playlist type
+        '-hls_segment_type', 'fmp4',
+        '-hls_fmp4_init_filename', 'init.mp4',  # Written next to the playlist
         '-hls_segment_filename', segment_pattern,
         '-hls_list_size', '0',  # Keep all segments in playlist
-        '-hls_flags', 'independent_segments',  # Each segment can be decoded independently
+        # Each segment can be decoded independently; segments are written to
+        # a temporary name and renamed once complete
+        '-hls_flags', 'independent_segments+temp_file',
         # Metadata
         '-metadata', f'title={title}',
         '-metadata', 'comment=Generated by PeterCS',
@@ -122,6 +141,7 @@ def create_master_playlist(
     # Using maxrate 3M + audio 128k = ~3.1M, estimate ~3.7M total with overhead
     bandwidth = 3700000  # ~3.7 Mbps
     
+    # fMP4 segments need HLS version 7
     # H.264 codec string: avc1.640028 (High profile, level 4.0)
     # AAC codec string: mp4a.40.2 (AAC-LC)
     codecs = 'avc1.640028,mp4a.40.2'
@@ -131,7 +151,7 @@ def create_master_playlist(
     relative_path_str = str(relative_path).replace('\\', '/')
     
     master_content = f"""#EXTM3U
-#EXT-X-VERSION:3
+#EXT-X-VERSION:7
 #EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={video_width}x{video_height},CODECS="{codecs}"
 {relative_path_str}
 """
@@ -141,14 +161,17 @@ def create_master_playlist(
 
 
 def generate_poster_image(
-    first_segment_path: Path,
+    rendition_playlist: Path,
     output_path: Path
 ) -> Path:
     """
-    Generate poster image from first segment of HLS video.
+    Generate poster image from the start of the HLS video.
+    
+    fMP4 segments can't be decoded without their init segment, so the frame
+    is read through the rendition playlist.
     
     Args:
-        first_segment_path: Path to first segment (seg_000.ts)
+        rendition_playlist: Path to the rendition playlist (720p/index.m3u8)
         output_path: Path to save poster.jpg
         
     Returns:
@@ -159,7 +182,7 @@ def generate_poster_image(
     # Extract frame at 1 second mark as poster
     cmd = [
         'ffmpeg',
-        '-i', str(first_segment_path),
+        '-i', str(rendition_playlist),
         '-ss', '00:00:01',
         '-vframes', '1',
         '-y',  # Overwrite if exists
@@ -173,7 +196,7 @@ def generate_poster_image(
         # Try extracting frame at 0 seconds as fallback
         cmd_fallback = [
             'ffmpeg',
-            '-i', str(first_segment_path),
+            '-i', str(rendition_playlist),
             '-ss', '00:00:00',
             '-vframes', '1',
             '-y',
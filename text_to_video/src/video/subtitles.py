@@ -1,9 +1,34 @@
 """Subtitle generation for video captions."""
 
+import functools
+import os
+import string
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+
+# Numba is optional - it only speeds up the script-to-Whisper word alignment
+try:
+    import numpy as np
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    np = None
+    njit = None
+    NUMBA_AVAILABLE = False
+
+# Pillow is optional - without it caption widths are estimated per character
+try:
+    from PIL import ImageFont
+    PIL_AVAILABLE = True
+except ImportError:
+    ImageFont = None
+    PIL_AVAILABLE = False
 
 from config import (
+    ASSETS_DIR,
+    CHARACTERS,
     VIDEO_WIDTH,
     VIDEO_HEIGHT,
     CAPTION_FONT_SIZE,
@@ -19,9 +44,152 @@ from config import (
     TITLE_STROKE_WIDTH,
     TITLE_FADE_DURATION,
 )
-from utils.text_processing import strip_emotion_markers
+from utils.text_processing import get_clean_text
 from utils.media_utils import get_audio_duration
 
+# Transcripts longer than this keep their timestamps in compact float arrays
+COMPACT_TIMINGS_THRESHOLD = 1000
+
+# Needleman-Wunsch scores for aligning script words with Whisper words
+NW_MATCH_SCORE = 10
+NW_MISMATCH_SCORE = -5
+NW_GAP_SCORE = -5
+
+# Estimated glyph widths for Nunito-Black at CAPTION_FONT_SIZE
+# Bold fonts are wider - approximately 0.65x font size per character
+CAPTION_CHAR_WIDTH_PX = CAPTION_FONT_SIZE * 0.65
+CAPTION_SPACE_WIDTH_PX = CAPTION_FONT_SIZE * 0.3
+# Max caption width with padding (leave 10% margin on each side)
+CAPTION_MAX_WIDTH_PX = VIDEO_WIDTH * CAPTION_MAX_WIDTH_PERCENT
+CAPTION_FONT_PATH = ASSETS_DIR / "fonts" / "Nunito-Black.ttf"
+
+# Caption event line: start, end, style, override tags, text
+DIALOGUE_TMPL = "Dialogue: 0,%s,%s,%s,,0,0,0,,%s%s\n"
+
+# Preformatted ASS style lines keyed by (character, bold, bottom margin)
+_STYLE_CACHE: Dict[Tuple[str, int, int], str] = {}
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _align_token_ids_jit(script_ids, whisper_ids, match_score, mismatch_score, gap_score):
+        """
+        Compiled Needleman-Wunsch table fill and backtrace over integer token
+        ids; returns the whisper index of each script token, -1 if unaligned.
+        """
+        rows = script_ids.shape[0] + 1
+        cols = whisper_ids.shape[0] + 1
+        scores = np.empty((rows, cols), dtype=np.int32)
+        for j in range(cols):
+            scores[0, j] = j * gap_score
+        for i in range(1, rows):
+            scores[i, 0] = i * gap_score
+            token = script_ids[i - 1]
+            for j in range(1, cols):
+                if whisper_ids[j - 1] == token:
+                    best = scores[i - 1, j - 1] + match_score
+                else:
+                    best = scores[i - 1, j - 1] + mismatch_score
+                up = scores[i - 1, j] + gap_score
+                if up > best:
+                    best = up
+                left = scores[i, j - 1] + gap_score
+                if left > best:
+                    best = left
+                scores[i, j] = best
+        
+        mapping = np.full(rows - 1, -1, dtype=np.int32)
+        i, j = rows - 1, cols - 1
+        while i > 0 and j > 0:
+            if script_ids[i - 1] == whisper_ids[j - 1]:
+                diagonal_score = match_score
+            else:
+                diagonal_score = mismatch_score
+            if scores[i, j] == scores[i - 1, j - 1] + diagonal_score:
+                mapping[i - 1] = j - 1
+                i -= 1
+                j -= 1
+            elif scores[i, j] == scores[i - 1, j] + gap_score:
+                i -= 1
+            else:
+                j -= 1
+        return mapping
+
+
+def _fill_alignment_scores(script_tokens: List[str], whisper_tokens: List[str]) -> List[List[int]]:
+    """Fill the Needleman-Wunsch score matrix for two token sequences."""
+    match, mismatch, gap = NW_MATCH_SCORE, NW_MISMATCH_SCORE, NW_GAP_SCORE
+    scores = [[j * gap for j in range(len(whisper_tokens) + 1)]]
+    for i, token in enumerate(script_tokens, start=1):
+        prev_row = scores[-1]
+        left = i * gap
+        row = [left]
+        # prev_row[j] is the diagonal neighbour and prev_row[j + 1] the one above
+        for j, whisper_token in enumerate(whisper_tokens):
+            best = prev_row[j] + (match if whisper_token == token else mismatch)
+            up = prev_row[j + 1] + gap
+            if up > best:
+                best = up
+            if left + gap > best:
+                best = left + gap
+            row.append(best)
+            left = best
+        scores.append(row)
+    return scores
+
+
+def _align_tokens(script_tokens: List[str], whisper_tokens: List[str]) -> List[Optional[int]]:
+    """Globally align two token sequences; maps each script index to a whisper index or None."""
+    if NUMBA_AVAILABLE:
+        # Map tokens to dense integer ids so the compiled kernel compares ints;
+        # only the O(N) mapping comes back to Python, never the score matrix
+        vocab = {}
+        script_ids = np.array([vocab.setdefault(t, len(vocab)) for t in script_tokens], dtype=np.int32)
+        whisper_ids = np.array([vocab.setdefault(t, len(vocab)) for t in whisper_tokens], dtype=np.int32)
+        mapping = _align_token_ids_jit(
+            script_ids, whisper_ids, NW_MATCH_SCORE, NW_MISMATCH_SCORE, NW_GAP_SCORE
+        )
+        return [None if j < 0 else j for j in mapping.tolist()]
+    
+    # Backtrace the score matrix into a script index -> whisper index mapping
+    scores = _fill_alignment_scores(script_tokens, whisper_tokens)
+    mapping = [None] * len(script_tokens)
+    i, j = len(script_tokens), len(whisper_tokens)
+    while i > 0 and j > 0:
+        if script_tokens[i - 1] == whisper_tokens[j - 1]:
+            diagonal_score = NW_MATCH_SCORE
+        else:
+            diagonal_score = NW_MISMATCH_SCORE
+        if scores[i][j] == scores[i - 1][j - 1] + diagonal_score:
+            mapping[i - 1] = j - 1
+            i -= 1
+            j -= 1
+        elif scores[i][j] == scores[i - 1][j] + NW_GAP_SCORE:
+            i -= 1
+        else:
+            j -= 1
+    return mapping
+
+
+@functools.lru_cache(maxsize=1)
+def _caption_glyph_widths() -> Dict[str, float]:
+    """Measure printable glyph widths of the caption font once per process."""
+    widths = {' ': CAPTION_SPACE_WIDTH_PX}
+    if PIL_AVAILABLE and CAPTION_FONT_PATH.exists():
+        try:
+            font = ImageFont.truetype(str(CAPTION_FONT_PATH), CAPTION_FONT_SIZE)
+            widths.update({ch: font.getlength(ch) for ch in string.printable})
+        except OSError as e:
+            print(f"Warning: Could not load caption font for measuring ({e})")
+    return widths
+
+
+@functools.lru_cache(maxsize=8192)
+def _measure_caption_word(word: str) -> float:
+    """Estimate the rendered width of a caption word in pixels."""
+    widths = _caption_glyph_widths()
+    return sum(widths.get(c, CAPTION_CHAR_WIDTH_PX) for c in word)
+
 
 class SubtitleGenerator:
     """Generates ASS subtitle files with chunked text display."""
@@ -45,7 +213,9 @@ class SubtitleGenerator:
         Align script words with Whisper timestamps.
         
         Uses Whisper timestamps for timing but script words for caption text.
-        If word counts don't match, distributes timestamps proportionally.
+        Words are globally aligned with Needleman-Wunsch so dropped or inserted
+        Whisper words don't shift the rest of the line; script words with no
+        Whisper counterpart are spread evenly between their aligned neighbours.
         """
         if not whisper_timings:
             # No Whisper timings, use estimated timing
@@ -58,70 +228,58 @@ class SubtitleGenerator:
         def normalize_word(w):
             return w.lower().strip('.,!?;:')
         
+        script_normalized = [normalize_word(w) for w in script_words]
         whisper_normalized = [normalize_word(w['word']) for w in whisper_timings]
+        if len(whisper_timings) > COMPACT_TIMINGS_THRESHOLD:
+            starts = array('d', (w['start'] for w in whisper_timings))
+            ends = array('d', (w['end'] for w in whisper_timings))
+        else:
+            starts = [w['start'] for w in whisper_timings]
+            ends = [w['end'] for w in whisper_timings]
+        
+        mapping = _align_tokens(script_normalized, whisper_normalized)
         
         aligned = []
-        whisper_idx = 0
+        for script_word, whisper_idx in zip(script_words, mapping):
+            if whisper_idx is None:
+                aligned.append({'word': script_word, 'start': None, 'end': None})
+            else:
+                aligned.append({
+                    'word': script_word,
+                    'start': starts[whisper_idx],
+                    'end': ends[whisper_idx]
+                })
         
-        for script_idx, script_word in enumerate(script_words):
-            script_norm = normalize_word(script_word)
+        # Interpolate runs of unaligned script words between their neighbours
+        script_idx = 0
+        while script_idx < len(aligned):
+            if mapping[script_idx] is not None:
+                script_idx += 1
+                continue
             
-            found_match = False
-            search_window = min(5, len(whisper_timings) - whisper_idx)
+            run_end = script_idx
+            while run_end < len(aligned) and mapping[run_end] is None:
+                run_end += 1
             
-            for i in range(whisper_idx, whisper_idx + search_window):
-                if i < len(whisper_normalized) and whisper_normalized[i] == script_norm:
-                    aligned.append({
-                        'word': script_word,
-                        'start': whisper_timings[i]['start'],
-                        'end': whisper_timings[i]['end']
-                    })
-                    whisper_idx = i + 1
-                    found_match = True
-                    break
+            gap_start = aligned[script_idx - 1]['end'] if script_idx > 0 else 0.0
+            gap_end = aligned[run_end]['start'] if run_end < len(aligned) else duration
+            time_per_word = max(0, gap_end - gap_start) / (run_end - script_idx)
             
-            if not found_match:
-                if whisper_idx < len(whisper_timings):
-                    aligned.append({
-                        'word': script_word,
-                        'start': whisper_timings[whisper_idx]['start'],
-                        'end': whisper_timings[whisper_idx]['end']
-                    })
-                    whisper_idx += 1
-                else:
-                    if aligned:
-                        last_end = aligned[-1]['end']
-                        remaining_words = len(script_words) - script_idx
-                        remaining_time = max(0, duration - last_end)
-                        time_per_word = remaining_time / max(remaining_words, 1)
-                        
-                        aligned.append({
-                            'word': script_word,
-                            'start': last_end,
-                            'end': last_end + time_per_word
-                        })
-                    else:
-                        time_per_word = duration / len(script_words)
-                        aligned.append({
-                            'word': script_word,
-                            'start': script_idx * time_per_word,
-                            'end': (script_idx + 1) * time_per_word
-                        })
+            for offset, word_timing in enumerate(aligned[script_idx:run_end]):
+                word_timing['start'] = gap_start + offset * time_per_word
+                word_timing['end'] = gap_start + (offset + 1) * time_per_word
+            script_idx = run_end
         
         # Clamp timestamps to duration
         MIN_WORD_DISPLAY_TIME = 0.15
         
-        filtered_aligned = []
-        for word_timing in aligned:
-            if word_timing['start'] < duration:
-                if word_timing['end'] > duration:
-                    word_timing['end'] = duration
-
-                min_end = word_timing['start'] + MIN_WORD_DISPLAY_TIME
-                if word_timing['end'] < min_end:
-                    word_timing['end'] = min(min_end, duration)
-
-                filtered_aligned.append(word_timing)
+        filtered_aligned = [w for w in aligned if w['start'] < duration]
+        for word_timing in filtered_aligned:
+            # End within the audio, but show each word for a minimum time
+            word_timing['end'] = max(
+                min(word_timing['end'], duration),
+                min(word_timing['start'] + MIN_WORD_DISPLAY_TIME, duration)
+            )
 
         if filtered_aligned and filtered_aligned[-1]['end'] < duration:
             filtered_aligned[-1]['end'] = duration
@@ -132,7 +290,8 @@ class SubtitleGenerator:
         """
         Chunk words into groups that fit within screen width.
         
-        Uses pixel-based estimation to ensure text fits on one line.
+        Uses per-glyph widths of the caption font (when Pillow is available)
+        to ensure text fits on one line.
         
         Args:
             word_timings: List of word timing dicts with 'word', 'start', 'end'
@@ -143,27 +302,21 @@ class SubtitleGenerator:
         if not word_timings:
             return []
 
-        # Estimate character width for Nunito-Black at CAPTION_FONT_SIZE
-        # Bold fonts are wider - approximately 0.65x font size per character
-        char_width = CAPTION_FONT_SIZE * 0.65
-        space_width = CAPTION_FONT_SIZE * 0.3
-        
-        # Max width with padding (leave 10% margin on each side)
-        max_width = VIDEO_WIDTH * 0.80
+        space_width = _caption_glyph_widths()[' ']
 
         chunks = []
         current_chunk = []
         current_width = 0
 
         for word_timing in word_timings:
-            word = word_timing['word']
-            word_width = len(word) * char_width + space_width
+            word_px = _measure_caption_word(word_timing['word'])
+            word_width = word_px + space_width
 
             # Start new chunk if this word would exceed max width
-            if current_chunk and (current_width + word_width > max_width):
+            if current_chunk and (current_width + word_width > CAPTION_MAX_WIDTH_PX):
                 chunks.append(current_chunk)
                 current_chunk = [word_timing]
-                current_width = len(word) * char_width
+                current_width = word_px
             else:
                 current_chunk.append(word_timing)
                 current_width += word_width
@@ -173,15 +326,24 @@ class SubtitleGenerator:
 
         return chunks
 
-    def _format_ass_time(self, seconds: float) -> str:
+    @staticmethod
+    def _format_ass_time(seconds: float) -> str:
         """Format seconds as ASS time format (H:MM:SS.CS)."""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        centisecs = int((seconds % 1) * 100)
+        # ASS time resolution is centiseconds, so cache on the truncated value
+        return SubtitleGenerator._format_ass_centiseconds(int(seconds * 100))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _format_ass_centiseconds(total_centisecs: int) -> str:
+        """Format a centisecond count as ASS time format (H:MM:SS.CS)."""
+        hours, remainder = divmod(total_centisecs, 360000)
+        minutes, remainder = divmod(remainder, 6000)
+        secs, centisecs = divmod(remainder, 100)
         return f"{hours}:{minutes:02d}:{secs:02d}.{centisecs:02d}"
 
-    def _hex_to_ass_color(self, hex_color: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _hex_to_ass_color(hex_color: str) -> str:
         """Convert hex color (#RRGGBB) to ASS format (&H00BBGGRR)."""
         hex_color = hex_color.strip().lower()
         
@@ -214,7 +376,8 @@ class SubtitleGenerator:
         self,
         audio_files: List[Dict],
         output_dir: Path,
-        title: str
+        title: str,
+        timestamp_dir: Path = None
     ) -> Tuple[Path, List[Path]]:
         """
         Create an ASS subtitle file with chunked text display and title sequence.
@@ -223,11 +386,13 @@ class SubtitleGenerator:
             audio_files: List of audio info dicts
             output_dir: Output directory for subtitle file
             title: Video title to display
+            timestamp_dir: Directory for timestamp cache files (default: output_dir)
 
         Returns:
             tuple: (subtitle_path, list of timestamp cache files created)
         """
         subtitle_path = output_dir / "subtitles.ass"
+        timestamp_dir = timestamp_dir or output_dir
         timestamp_files = []
 
         # Fixed position for captions (center-bottom)
@@ -240,13 +405,29 @@ class SubtitleGenerator:
         bold_value = -1 if CAPTION_FONT_WEIGHT >= 700 else 0
         title_bold = -1 if TITLE_FONT_WEIGHT >= 700 else 0
 
-        # Get unique characters
-        characters_in_script = list(set(audio_info["character"] for audio_info in audio_files))
-        
-        from config import CHARACTERS
-
-        # ASS header - WrapStyle 0 for title (allows wrapping), captions use \q2 override
-        ass_content = f"""[Script Info]
+        # Get unique characters in order of first appearance
+        characters_in_script = list(dict.fromkeys(audio_info["character"] for audio_info in audio_files))
+
+
+        # Fetch durations and word timestamps for all audio files concurrently.
+        # Results are consumed in script order below so timing stays deterministic.
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+            pending = []
+            for audio_info in audio_files:
+                audio_path = audio_info["audio_path"]
+                timestamp_cache = self.transcriber.get_cache_path(audio_path, timestamp_dir)
+                timestamp_files.append(timestamp_cache)
+                duration_future = executor.submit(get_audio_duration, audio_path)
+                timings_future = executor.submit(
+                    self.transcriber.get_word_timestamps,
+                    audio_path, get_clean_text(audio_info), timestamp_cache
+                )
+                pending.append((audio_info, duration_future, timings_future))
+
+        # Stream the ASS document to disk as it is generated
+        with open(subtitle_path, 'w', encoding='utf-8-sig', buffering=65536) as f:
+            # ASS header - WrapStyle 0 for title (allows wrapping), captions use \q2 override
+            f.write(f"""[Script Info]
 Title: Generated Subtitles
 ScriptType: v4.00+
 WrapStyle: 0
@@ -256,108 +437,103 @@ ScaledBorderAndShadow: yes
 
 [V4+ Styles]
 Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-"""
+""")
         
-        # Add styles for each character - these use fixed positioning via override tags
-        for character in characters_in_script:
-            if character in CHARACTERS:
-                char_color_hex = CHARACTERS[character].get("caption_color", "white")
-            else:
-                char_color_hex = "white"
-            
-            ass_color = self._hex_to_ass_color(char_color_hex)
-            
-            # Alignment 2 = bottom-center
-            ass_content += f"Style: {character},Nunito-Black,{CAPTION_FONT_SIZE},{ass_color},&H00FFFFFF,&H00000000,&HFF000000,{bold_value},0,0,0,100,100,0,0,1,{CAPTION_STROKE_WIDTH},0,2,40,40,{caption_margin_bottom},1\n"
+            # Add styles for each character - these use fixed positioning via override tags
+            def _gen_styles():
+                for character in characters_in_script:
+                    style_key = (character, bold_value, caption_margin_bottom)
+                    style_line = _STYLE_CACHE.get(style_key)
+                    if style_line is None:
+                        if character in CHARACTERS:
+                            char_color_hex = CHARACTERS[character].get("caption_color", "white")
+                        else:
+                            char_color_hex = "white"
+
+                        ass_color = self._hex_to_ass_color(char_color_hex)
+
+                        # Alignment 2 = bottom-center
+                        style_line = f"Style: {character},Nunito-Black,{CAPTION_FONT_SIZE},{ass_color},&H00FFFFFF,&H00000000,&HFF000000,{bold_value},0,0,0,100,100,0,0,1,{CAPTION_STROKE_WIDTH},0,2,40,40,{caption_margin_bottom},1\n"
+                        _STYLE_CACHE[style_key] = style_line
+                    yield style_line
+
+            f.writelines(_gen_styles())
         
-        # Title style - Alignment 8 = top-center, allows word wrapping
-        title_margin_horizontal = 40
-        ass_content += f"Style: title,Nunito-Black,{TITLE_FONT_SIZE},&H00FFFFFF,&H00FFFFFF,&H00000000,&HFF000000,{title_bold},0,0,0,100,100,0,0,1,{TITLE_STROKE_WIDTH},0,8,{title_margin_horizontal},{title_margin_horizontal},100,1\n"
+            # Title style - Alignment 8 = top-center, allows word wrapping
+            title_margin_horizontal = 40
+            f.write(f"Style: title,Nunito-Black,{TITLE_FONT_SIZE},&H00FFFFFF,&H00FFFFFF,&H00000000,&HFF000000,{title_bold},0,0,0,100,100,0,0,1,{TITLE_STROKE_WIDTH},0,8,{title_margin_horizontal},{title_margin_horizontal},100,1\n")
         
-        ass_content += """
+            f.write("""
 [Events]
 Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-"""
-
-        # Add title (allows multi-line wrapping)
-        title_text = title.upper()
-        estimated_chars = len(title_text)
-        if estimated_chars > 0:
-            max_width = VIDEO_WIDTH * 0.8
-            calculated_font_size = int(max_width / (estimated_chars * 0.55))
-            title_font_size = max(60, min(calculated_font_size, 50))
-        else:
-            title_font_size = 50
+""")
+
+            # Add title (allows multi-line wrapping)
+            title_text = title.upper()
+            # Only visible glyphs take up width; spaces are where the title wraps
+            estimated_chars = sum(1 for c in title_text if not c.isspace()) or 1
+            title_font_size = max(60, min(int((VIDEO_WIDTH * 0.8) / (estimated_chars * 0.55)), TITLE_FONT_SIZE))
         
-        title_start = self._format_ass_time(0)
-        title_end = self._format_ass_time(TITLE_DURATION)
-        fade_in_ms = 0
-        fade_out_ms = int(TITLE_FADE_DURATION * 1000)
+            title_start = self._format_ass_time(0)
+            title_end = self._format_ass_time(TITLE_DURATION)
+            fade_in_ms = 0
+            fade_out_ms = int(TITLE_FADE_DURATION * 1000)
         
-        # Title uses style wrapping (no \q2), can be multi-line
-        ass_content += f"Dialogue: 0,{title_start},{title_end},title,,0,0,0,,{{\\fad({fade_in_ms},{fade_out_ms})\\fs{title_font_size}}}{title_text}\n"
-
-        # Process audio files and create subtitle events
-        current_time = 0.0
-
-        for audio_info in audio_files:
-            duration = get_audio_duration(audio_info["audio_path"])
-            character = audio_info["character"]
-            text = audio_info["text"]
-            audio_path = audio_info["audio_path"]
-
-            # Strip emotion markers
-            text_for_display = strip_emotion_markers(text)
-            script_words = text_for_display.split()
-
-            # Get word timestamps
-            timestamp_cache = output_dir / f"{audio_path.stem}_timestamps.json"
-            timestamp_files.append(timestamp_cache)
-            whisper_timings = self.transcriber.get_word_timestamps(
-                audio_path, text_for_display, timestamp_cache
-            )
-
-            # Align words with timestamps
-            word_timings = self._align_script_words_with_timestamps(
-                script_words, whisper_timings, duration
-            )
-
-            # Chunk words to fit within screen width
-            chunks = self._chunk_words_by_width(word_timings)
-
-            # Add each chunk as a single subtitle event with fixed position
-            # Ensure no overlap: each chunk ends when the next one starts
-            for i, chunk in enumerate(chunks):
-                if not chunk:
-                    continue
+            # Title uses style wrapping (no \q2), can be multi-line
+            f.write(f"Dialogue: 0,{title_start},{title_end},title,,0,0,0,,{{\\fad({fade_in_ms},{fade_out_ms})\\fs{title_font_size}}}{title_text}\n")
+
+            # Process audio files and create subtitle events
+            current_time = 0.0
+
+            # \an2 = bottom-center alignment
+            # \pos(x,y) = fixed position
+            # \q2 = no word wrap (force single line)
+            pos_tag = f"{{\\an2\\pos({caption_x},{caption_y})\\q2}}"
+
+            for audio_info, duration_future, timings_future in pending:
+                duration = duration_future.result()
+                character = audio_info["character"]
+                text_for_display = get_clean_text(audio_info)
+                script_words = text_for_display.split()
+
+                # Get word timestamps
+                whisper_timings = timings_future.result()
+
+                # Align words with timestamps
+                word_timings = self._align_script_words_with_timestamps(
+                    script_words, whisper_timings, duration
+                )
+
+                # Chunk words to fit within screen width
+                chunks = self._chunk_words_by_width(word_timings)
+
+                # Add each chunk as a single subtitle event with fixed position
+                # Ensure no overlap: each chunk ends when the next one starts
+                events = []
+                for i, chunk in enumerate(chunks):
+                    if not chunk:
+                        continue
                 
-                chunk_start = current_time + chunk[0]['start']
+                    chunk_start = current_time + chunk[0]['start']
                 
-                # End time: start of next chunk, or end of last word if this is the last chunk
-                if i + 1 < len(chunks) and chunks[i + 1]:
-                    # End exactly when next chunk starts (no overlap)
-                    chunk_end = current_time + chunks[i + 1][0]['start']
-                else:
-                    # Last chunk: end when last word ends
-                    chunk_end = current_time + chunk[-1]['end']
-                
-                # Build chunk text (all words in chunk)
-                chunk_text = " ".join(w['word'] for w in chunk)
+                    # End time: start of next chunk, or end of last word if this is the last chunk
+                    if i + 1 < len(chunks) and chunks[i + 1]:
+                        # End exactly when next chunk starts (no overlap)
+                        chunk_end = current_time + chunks[i + 1][0]['start']
+                    else:
+                        # Last chunk: end when last word ends
+                        chunk_end = current_time + chunk[-1]['end']
                 
-                start_time = self._format_ass_time(chunk_start)
-                end_time = self._format_ass_time(chunk_end)
+                    # Build chunk text (all words in chunk)
+                    chunk_text = " ".join(w['word'] for w in chunk)
                 
-                # \an2 = bottom-center alignment
-                # \pos(x,y) = fixed position
-                # \q2 = no word wrap (force single line)
-                pos_tag = f"{{\\an2\\pos({caption_x},{caption_y})\\q2}}"
+                    start_time = self._format_ass_time(chunk_start)
+                    end_time = self._format_ass_time(chunk_end)
                 
-                ass_content += f"Dialogue: 0,{start_time},{end_time},{character},,0,0,0,,{pos_tag}{chunk_text}\n"
+                    events.append(DIALOGUE_TMPL % (start_time, end_time, character, pos_tag, chunk_text))
 
-            current_time += duration
-        
-        # Write subtitle file
-        with open(subtitle_path, 'w', encoding='utf-8-sig') as f:
-            f.write(ass_content)
+                f.writelines(events)
+
+                current_time += duration
 
         return subtitle_path, timestamp_files
@@ -1,65 +1,170 @@
 """Whisper transcription for word-level timestamps."""
 
+import functools
+import hashlib
 import json
+import mmap
+import os
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
+# Prefer faster_whisper (CTranslate2 backend, int8 weights, batched decoding)
+try:
+    from faster_whisper import WhisperModel, BatchedInferencePipeline
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    WhisperModel = None
+    BatchedInferencePipeline = None
+    FASTER_WHISPER_AVAILABLE = False
+
 # Try to import stable_whisper - it's optional (large dependency)
 try:
     import stable_whisper
-    WHISPER_AVAILABLE = True
+    STABLE_WHISPER_AVAILABLE = True
 except ImportError:
     stable_whisper = None
-    WHISPER_AVAILABLE = False
-    print("⚠ stable_whisper not installed - word-level timestamps will be estimated")
+    STABLE_WHISPER_AVAILABLE = False
+
+WHISPER_AVAILABLE = FASTER_WHISPER_AVAILABLE or STABLE_WHISPER_AVAILABLE
+if not WHISPER_AVAILABLE:
+    print("⚠ faster_whisper/stable_whisper not installed - word-level timestamps will be estimated")
+
+# Speech segments decoded together per forward pass (faster_whisper only)
+WHISPER_BATCH_SIZE = 8
 
+# Files transcribed at once; more only adds memory pressure on a shared model
+WHISPER_MAX_CONCURRENT = 4
+
+# Utterances shorter than this (seconds / script words) skip Whisper; evenly
+# spread estimated timing is indistinguishable for a short interjection
+MIN_WHISPER_DURATION = 0.8
+MIN_WHISPER_WORDS = 3
+
+from config import WHISPER_DEVICE
 from utils.cache import load_timestamp_cache, save_timestamp_cache
-from utils.text_processing import strip_emotion_markers
+from utils.text_processing import get_clean_text
+from utils.media_utils import get_audio_duration
+
+
+def _cuda_available() -> bool:
+    """Check whether the active Whisper backend can run on a CUDA device."""
+    if WHISPER_DEVICE == "cpu":
+        return False
+    try:
+        if FASTER_WHISPER_AVAILABLE:
+            import ctranslate2
+            return ctranslate2.get_cuda_device_count() > 0
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+@functools.lru_cache(maxsize=1024)
+def _hash_file_contents(path: str, mtime_ns: int, size: int) -> str:
+    """Hash file contents; mtime and size key the memo so rewritten files are rehashed."""
+    digest = hashlib.blake2b(digest_size=16)
+    if size:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            digest.update(mm)
+    return digest.hexdigest()
+
+
+def _audio_hash(audio_path: Path) -> str:
+    """Content hash of an audio file, so identical audio shares one timestamp cache."""
+    stat = audio_path.stat()
+    return _hash_file_contents(str(audio_path), stat.st_mtime_ns, stat.st_size)
 
 
 class Transcriber:
     """Handles Whisper transcription for word-level timestamps."""
 
+    # The model is shared by every Transcriber in the process
+    whisper_model = None
+    _use_cuda = False
+    # Set once the model is loaded so later callers skip the lock
+    _model_ready = threading.Event()
+    _whisper_lock = threading.Lock()
+    # stable_whisper installs per-call decoding hooks on the model, so
+    # forward passes on a shared model must not overlap
+    _inference_lock = threading.Lock()
+
     def __init__(self):
-        self.whisper_model = None
-        self._whisper_lock = threading.Lock()
         self._transcription_cache = {}
 
     def _load_whisper_model(self):
-        """Load Whisper model in a thread-safe manner."""
+        """Load the process-wide Whisper model in a thread-safe manner."""
         if not WHISPER_AVAILABLE:
             return None
-            
-        if self.whisper_model is None:
-            with self._whisper_lock:
-                if self.whisper_model is None:
-                    print("Loading Whisper model (one-time, may take a moment)...")
-                    self.whisper_model = stable_whisper.load_model('tiny')
+
+        if self._model_ready.is_set():
+            return self.whisper_model
+
+        with self._whisper_lock:
+            if not self._model_ready.is_set():
+                Transcriber._use_cuda = _cuda_available()
+                device = 'cuda' if Transcriber._use_cuda else 'cpu'
+                print(f"Loading Whisper model on {device} (one-time, may take a moment)...")
+                if FASTER_WHISPER_AVAILABLE:
+                    # CTranslate2 workers let threads transcribe concurrently
+                    model = WhisperModel(
+                        'tiny',
+                        device=device,
+                        # int8 weights on both devices; GPU activations stay FP16
+                        compute_type='int8_float16' if Transcriber._use_cuda else 'int8',
+                        num_workers=max(1, (os.cpu_count() or 1) // 2)
+                    )
+                    Transcriber.whisper_model = BatchedInferencePipeline(model=model)
+                else:
+                    Transcriber.whisper_model = stable_whisper.load_model('tiny', device=device)
+                self._model_ready.set()
         return self.whisper_model
 
+    def get_cache_path(self, audio_path: Path, output_dir: Path) -> Path:
+        """Get the timestamp cache file for an audio file, keyed by its content hash."""
+        return output_dir / f"{_audio_hash(audio_path)}_timestamps.json"
+
+    @staticmethod
+    def _memo_key(cache_path: Path) -> str:
+        """In-memory cache key: the audio content hash, via the cache file's name."""
+        return cache_path.name
+
     def _transcribe_single_audio(
         self,
         audio_path: Path,
         text: str,
-        cache_path: Path
+        cache_path: Path,
+        cache_checked: bool = False
     ) -> Tuple[Path, List[Dict]]:
         """
         Transcribe a single audio file. Used for parallel processing.
         
+        Args:
+            cache_checked: True if the caller already found no file cache entry
+        
         Returns:
             Tuple of (audio_path, word_timings)
         """
         # Check cache first
-        cached = load_timestamp_cache(cache_path)
-        if cached is not None:
-            return audio_path, cached
+        if not cache_checked:
+            cached = load_timestamp_cache(cache_path)
+            if cached is not None:
+                return audio_path, cached
         
         # If whisper not available, return empty (will use estimated timing)
         if not WHISPER_AVAILABLE:
             return audio_path, []
         
         try:
+            # Short utterances use estimated timing; cache the empty result so
+            # the decision is not re-made on the next run
+            if (len(text.split()) < MIN_WHISPER_WORDS
+                    or get_audio_duration(audio_path) < MIN_WHISPER_DURATION):
+                save_timestamp_cache(cache_path, [])
+                return audio_path, []
+            
             # Load Whisper model (thread-safe)
             model = self._load_whisper_model()
             if model is None:
@@ -67,16 +172,29 @@ class Transcriber:
             
             # Transcribe with word-level timestamps
             print(f"Transcribing {audio_path.name} for precise word timing...")
-            result = model.transcribe(
-                str(audio_path),
-                word_timestamps=True,
-                regroup=True,
-                language='en'
-            )
+            if FASTER_WHISPER_AVAILABLE:
+                segments, _ = model.transcribe(
+                    str(audio_path),
+                    batch_size=WHISPER_BATCH_SIZE,
+                    word_timestamps=True,
+                    language='en'
+                )
+                # Segments are decoded lazily while iterating
+                segments = list(segments)
+            else:
+                with self._inference_lock:
+                    result = model.transcribe(
+                        str(audio_path),
+                        word_timestamps=True,
+                        regroup=True,
+                        language='en',
+                        fp16=self._use_cuda
+                    )
+                segments = result.segments
             
             # Extract word-level timing
             words = []
-            for segment in result.segments:
+            for segment in segments:
                 for word in segment.words:
                     words.append({
                         'word': word.word.strip(),
@@ -109,28 +227,43 @@ class Transcriber:
         
         Returns timestamps from Whisper (may not match script text exactly).
         """
-        # Check parallel transcription cache first
-        if audio_path in self._transcription_cache:
-            return self._transcription_cache[audio_path]
+        # Check parallel transcription cache first (keyed by content hash, so
+        # audio regenerated under the same name is not stale)
+        cache_key = self._memo_key(cache_path)
+        if cache_key in self._transcription_cache:
+            return self._transcription_cache[cache_key]
         
         # Check file cache
         cached = load_timestamp_cache(cache_path)
         if cached is not None:
-            self._transcription_cache[audio_path] = cached
+            self._transcription_cache[cache_key] = cached
             return cached
         
         # If not in cache, transcribe synchronously (fallback)
-        _, result = self._transcribe_single_audio(audio_path, text, cache_path)
-        self._transcription_cache[audio_path] = result
+        _, result = self._transcribe_single_audio(audio_path, text, cache_path, cache_checked=True)
+        self._transcription_cache[cache_key] = result
         return result
 
+    def _collect_results(
+        self,
+        tasks: List[Tuple[Path, str, Path]]
+    ) -> Dict[Path, List[Dict]]:
+        """Map each task's audio path to its word timings from the in-memory cache."""
+        results = {}
+        for audio_path, _, cache_path in tasks:
+            cache_key = self._memo_key(cache_path)
+            if cache_key not in self._transcription_cache:
+                self._transcription_cache[cache_key] = load_timestamp_cache(cache_path) or []
+            results[audio_path] = self._transcription_cache[cache_key]
+        return results
+
     def transcribe_all_audio_parallel(
         self,
         audio_files: List[Dict],
         output_dir: Path
     ) -> Dict[Path, List[Dict]]:
         """
-        Transcribe all audio files sequentially.
+        Transcribe all audio files using a thread pool.
 
         Args:
             audio_files: List of audio info dicts with 'audio_path' and 'text' keys
@@ -143,44 +276,56 @@ class Transcriber:
         tasks = []
         for audio_info in audio_files:
             audio_path = audio_info["audio_path"]
-            text = strip_emotion_markers(audio_info.get("text", ""))
-            cache_path = output_dir / f"{audio_path.stem}_timestamps.json"
+            text = get_clean_text(audio_info)
+            cache_path = self.get_cache_path(audio_path, output_dir)
             tasks.append((audio_path, text, cache_path))
 
-        # Filter out tasks that are already cached
+        # Filter out tasks that are already cached, and only schedule
+        # identical audio content once
         tasks_to_process = []
+        scheduled_cache_paths = set()
         for audio_path, text, cache_path in tasks:
             cached = load_timestamp_cache(cache_path)
             if cached is not None:
                 # Load from cache
-                self._transcription_cache[audio_path] = cached
-            else:
+                self._transcription_cache[self._memo_key(cache_path)] = cached
+            elif cache_path not in scheduled_cache_paths:
+                scheduled_cache_paths.add(cache_path)
                 tasks_to_process.append((audio_path, text, cache_path))
 
         if not tasks_to_process:
             print("All audio files already transcribed (using cache).")
-            return self._transcription_cache
+            return self._collect_results(tasks)
 
         if not WHISPER_AVAILABLE:
             print("Whisper not available - using estimated word timing for all audio files.")
             for audio_path, text, cache_path in tasks_to_process:
-                self._transcription_cache[audio_path] = []
-            return self._transcription_cache
+                self._transcription_cache[self._memo_key(cache_path)] = []
+            return self._collect_results(tasks)
 
         print(f"Transcribing {len(tasks_to_process)} audio file(s)...")
 
         # Load model before processing (ensures it's loaded once)
         self._load_whisper_model()
 
-        # Transcribe sequentially
-        for audio_path, text, cache_path in tasks_to_process:
-            try:
-                result_path, word_timings = self._transcribe_single_audio(audio_path, text, cache_path)
-                self._transcription_cache[result_path] = word_timings
-            except Exception as e:
-                print(f"Error transcribing {audio_path.name}: {e}")
-                self._transcription_cache[audio_path] = []
+        # Transcribe in parallel
+        max_workers = min(len(tasks_to_process), WHISPER_MAX_CONCURRENT, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self._transcribe_single_audio, audio_path, text, cache_path, cache_checked=True
+                ): (audio_path, cache_path)
+                for audio_path, text, cache_path in tasks_to_process
+            }
+            for future in as_completed(futures):
+                audio_path, cache_path = futures[future]
+                try:
+                    _, word_timings = future.result()
+                    self._transcription_cache[self._memo_key(cache_path)] = word_timings
+                except Exception as e:
+                    print(f"Error transcribing {audio_path.name}: {e}")
+                    self._transcription_cache[self._memo_key(cache_path)] = []
 
         print(f"Completed transcription of {len(tasks_to_process)} audio file(s).")
-        return self._transcription_cache
+        return self._collect_results(tasks)
 
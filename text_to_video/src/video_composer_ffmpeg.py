@@ -1,19 +1,174 @@
 """Video composition using FFmpeg directly - more reliable than MoviePy."""
 
-import subprocess
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict
 from datetime import datetime
 
 from config import (
+    BACKGROUNDS_DIR,
+    CHARACTERS_DIR,
+    CONFIG_VERSION,
+    TIMESTAMP_CACHE_DIR,
     get_topic_dirs,
 )
 from video.transcription import Transcriber
 from video.subtitles import SubtitleGenerator
 from video.character_timing import CharacterTimingCalculator
-from video.ffmpeg_builder import FFmpegCommandBuilder
+from video.ffmpeg_builder import FFmpegCommandBuilder, BACKGROUND_CACHE_DIR, BACKGROUND_EXTENSIONS
 from video.hls_builder import build_hls_output, create_master_playlist, generate_poster_image
-from utils.media_utils import check_ffmpeg, get_audio_duration
+from utils.cache import link_file, link_tree
+from utils.media_utils import (
+    FILTER_THREADS,
+    check_ffmpeg,
+    get_audio_duration,
+    get_h264_encoder_args,
+    run_ffmpeg_with_progress,
+)
+
+
+logger = logging.getLogger(__name__)
+# No-op when the host application has already configured logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+# Bump to invalidate cached renders after changing how videos are composed
+RENDER_CACHE_VERSION = "1"
+# Written last into a render cache entry, holding the entry's size in bytes;
+# entries without it are incomplete
+RENDER_CACHE_MARKER = ".complete"
+# Incomplete entries younger than this may still be being stored
+RENDER_CACHE_STORE_GRACE = 3600
+# Cached renders unused for longer than this are pruned, then the least
+# recently used ones until a topic's cache fits in RENDER_CACHE_MAX_BYTES
+RENDER_CACHE_MAX_AGE = 7 * 24 * 3600
+RENDER_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# Work directories a failed render left behind are kept this long for a retry
+WORK_DIR_MAX_AGE = 24 * 3600
+
+# Minimum free space for putting render intermediates on tmpfs
+TMPFS_MIN_FREE_BYTES = 512 * 1024 * 1024
+
+
+def _preferred_tmpdir():
+    """Return /dev/shm if it is writable with room to spare, else None (system default)."""
+    shm = "/dev/shm"
+    try:
+        if os.access(shm, os.W_OK) and shutil.disk_usage(shm).free >= TMPFS_MIN_FREE_BYTES:
+            return shm
+    except OSError:
+        pass
+    return None
+
+
+def index_audio_files(audio_files: List[Dict]) -> Dict[str, List[Dict]]:
+    """Group audio info dicts by character, keyed in order of first appearance."""
+    by_character = defaultdict(list)
+    for audio_info in audio_files:
+        by_character[audio_info["character"]].append(audio_info)
+    return dict(by_character)
+
+
+def _asset_stats(directory: Path, suffixes=None) -> List[List]:
+    """(name, size, mtime_ns) of each file in directory, for cache keys."""
+    stats = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and (suffixes is None or entry.name.endswith(suffixes)):
+                    stat = entry.stat()
+                    stats.append([entry.name, stat.st_size, stat.st_mtime_ns])
+    except FileNotFoundError:
+        pass
+    return sorted(stats)
+
+
+def _tree_size(directory: Path) -> int:
+    """Total size of the files under directory."""
+    return sum(
+        (Path(root) / name).stat().st_size
+        for root, _, files in os.walk(directory)
+        for name in files
+    )
+
+
+def _prune_render_cache(renders_dir: Path):
+    """Drop stale render cache entries, then the least recently used over the size cap."""
+    now = datetime.now().timestamp()
+    entries = []
+    for entry in renders_dir.iterdir():
+        marker = entry / RENDER_CACHE_MARKER
+        try:
+            last_used = marker.stat().st_mtime
+            size = int(marker.read_text(encoding='ascii'))
+        except (FileNotFoundError, ValueError):
+            # A store in progress (possibly in another process) or one that
+            # was interrupted; only the latter is old enough to remove
+            try:
+                if now - entry.stat().st_mtime > RENDER_CACHE_STORE_GRACE:
+                    shutil.rmtree(entry, ignore_errors=True)
+            except FileNotFoundError:
+                pass
+            continue
+        entries.append((last_used, size, entry))
+    entries.sort(reverse=True)
+    
+    total = 0
+    for last_used, size, entry in entries:
+        if now - last_used > RENDER_CACHE_MAX_AGE or total + size > RENDER_CACHE_MAX_BYTES:
+            shutil.rmtree(entry, ignore_errors=True)
+        else:
+            total += size
+
+
+def _prune_work_dirs(work_root: Path):
+    """Remove work directories left by failed renders once WORK_DIR_MAX_AGE has passed."""
+    now = datetime.now().timestamp()
+    try:
+        with os.scandir(work_root) as entries:
+            stale = [
+                entry.path for entry in entries
+                if entry.is_dir() and now - entry.stat().st_mtime > WORK_DIR_MAX_AGE
+            ]
+    except FileNotFoundError:
+        return
+    for path in stale:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _publish_render(staging_dir: Path, video_dir: Path):
+    """Move a finished staging directory into place as video_dir."""
+    shutil.rmtree(video_dir, ignore_errors=True)
+    os.replace(staging_dir, video_dir)
+
+
+# Pipeline components are stateless apart from their caches, so every composer
+# in the process shares one set (and one resident Whisper model)
+@functools.lru_cache(maxsize=1)
+def _get_transcriber() -> Transcriber:
+    return Transcriber()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_subtitle_generator() -> SubtitleGenerator:
+    return SubtitleGenerator(_get_transcriber())
+
+
+@functools.lru_cache(maxsize=1)
+def _get_character_timing_calculator() -> CharacterTimingCalculator:
+    return CharacterTimingCalculator(_get_transcriber())
+
+
+@functools.lru_cache(maxsize=1)
+def _get_ffmpeg_builder() -> FFmpegCommandBuilder:
+    return FFmpegCommandBuilder()
 
 
 class VideoComposerFFmpeg:
@@ -21,17 +176,76 @@ class VideoComposerFFmpeg:
 
     def __init__(self, topic: str = None):
         self.topic = topic
-        self.transcriber = Transcriber()
-        self.subtitle_generator = SubtitleGenerator(self.transcriber)
-        self.character_timing_calculator = CharacterTimingCalculator(self.transcriber)
-        self.ffmpeg_builder = FFmpegCommandBuilder()
+        self.transcriber = _get_transcriber()
+        self.subtitle_generator = _get_subtitle_generator()
+        self.character_timing_calculator = _get_character_timing_calculator()
+        self.ffmpeg_builder = _get_ffmpeg_builder()
+
+    def _render_cache_key(self, audio_files: List[Dict], script: Dict, output_format: str) -> str:
+        """
+        Hash everything that determines a render: script, audio files,
+        settings, and the character images and backgrounds it can use.
+        """
+        audio_stats = []
+        for audio_info in audio_files:
+            stat = Path(audio_info["audio_path"]).stat()
+            audio_stats.append([stat.st_mtime_ns, stat.st_size])
+        characters = sorted({audio_info["character"] for audio_info in audio_files})
+        payload = json.dumps({
+            'script': script,
+            'audio': audio_stats,
+            'characters': {c: _asset_stats(CHARACTERS_DIR / c) for c in characters},
+            'backgrounds': _asset_stats(BACKGROUNDS_DIR, BACKGROUND_EXTENSIONS),
+            'format': output_format,
+            'config': CONFIG_VERSION,
+            'render': RENDER_CACHE_VERSION,
+        }, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+    def _restore_cached_render(
+        self,
+        render_cache: Path,
+        video_dir: Path,
+        output_name: str,
+        output_format: str
+    ):
+        """Link a complete cached render into video_dir; returns its output path or None."""
+        marker = render_cache / RENDER_CACHE_MARKER
+        if not marker.exists():
+            return None
+        # The marker's mtime records last use for _prune_render_cache
+        marker.touch()
+        if output_format == "hls":
+            link_tree(render_cache / "hls", video_dir)
+            return video_dir / "master.m3u8"
+        mp4_output = video_dir / f"{output_name}.mp4"
+        link_file(render_cache / "video.mp4", mp4_output)
+        return mp4_output
+
+    def _store_render(self, render_cache: Path, video_dir: Path, final_path: Path, output_format: str):
+        """
+        Link a finished render into the render cache, pruning old entries.
+        
+        The entry is built in a hidden sibling and moved into place complete,
+        so other processes never see it half-stored.
+        """
+        building = render_cache.with_name(f".{render_cache.name}.tmp")
+        shutil.rmtree(building, ignore_errors=True)
+        if output_format == "hls":
+            link_tree(video_dir, building / "hls")
+        else:
+            link_file(final_path, building / "video.mp4")
+        (building / RENDER_CACHE_MARKER).write_text(str(_tree_size(building)), encoding='ascii')
+        _publish_render(building, render_cache)
+        _prune_render_cache(render_cache.parent)
 
     def compose_video(
         self,
         audio_files: List[Dict],
         script: Dict,
         output_name: str = None,
-        output_format: str = "hls"
+        output_format: str = "hls",
+        by_character: Dict[str, List[Dict]] = None
     ) -> Path:
         """
         Compose the final video using FFmpeg.
@@ -41,6 +255,7 @@ class VideoComposerFFmpeg:
             script: Script dictionary with topic and lines
             output_name: Optional output filename (without extension)
             output_format: Output format - "hls" for HLS streaming or "mp4" for MP4 file (default: "hls")
+            by_character: Optional index_audio_files(audio_files), when the caller already has it
 
         Returns:
             Path to the generated master.m3u8 file (HLS) or MP4 file path
@@ -48,7 +263,7 @@ class VideoComposerFFmpeg:
         if output_format not in ["hls", "mp4"]:
             raise ValueError(f"output_format must be 'hls' or 'mp4', got '{output_format}'")
         
-        print(f"Composing video with FFmpeg ({output_format.upper()})...")
+        logger.info(f"Composing video with FFmpeg ({output_format.upper()})...")
 
         # Check FFmpeg availability
         if not check_ffmpeg():
@@ -71,173 +286,251 @@ class VideoComposerFFmpeg:
         hls_base = topic_dirs['video'] / "hls"
         video_id = output_name
         video_dir = hls_base / video_id
-        video_dir.mkdir(parents=True, exist_ok=True)
+        # Output is written to a hidden staging directory that replaces
+        # video_dir only once complete, so a half-written playlist is never
+        # served; a failed render's staging directory is kept for debugging
+        staging_dir = hls_base / f".{video_id}.staging"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        staging_dir.mkdir(parents=True, exist_ok=True)
+
+        # Identical inputs reuse an earlier render; the random background
+        # clip and start offset are not part of the key
+        render_cache = topic_dirs['video'] / ".renders" / self._render_cache_key(
+            audio_files, script, output_format
+        )
+        cached_path = self._restore_cached_render(render_cache, staging_dir, output_name, output_format)
+        if cached_path is not None:
+            _publish_render(staging_dir, video_dir)
+            cached_path = video_dir / cached_path.relative_to(staging_dir)
+            logger.info(f"[SUCCESS] Reused cached render ({render_cache.name}):")
+            logger.info(f"  Output path: {cached_path}")
+            return cached_path
         
-        # Transcribe all audio files in parallel (before they're needed)
-        print("Transcribing audio files for word-level timestamps...")
-        self.transcriber.transcribe_all_audio_parallel(audio_files, video_dir)
+        # Use LLM-generated title from script
+        video_title = script["title"]
+
+        # Files the filter graph references (subtitles, sprites, the filter
+        # script itself) go in a work directory keyed on the inputs, so a
+        # retry after a failed render finds an unchanged graph and skips its
+        # rewrite; it is removed once the render is published, and ones
+        # failed renders leave behind expire (timestamp caches are shared)
+        work_root = topic_dirs['video'] / ".work"
+        _prune_work_dirs(work_root)
+        work_dir = work_root / f"{render_cache.name}_{video_id}"
+        work_dir.mkdir(parents=True, exist_ok=True)
+        # A reused directory's age restarts, so no other render prunes it
+        os.utime(work_dir)
         
-        # Get background video (randomly selected)
-        background = self.ffmpeg_builder.get_background_video()
-        print(f"Using background: {background.name}")
+        # Single-use intermediates (concat list and log) live in a scratch
+        # directory, on tmpfs when available; it is removed on exit,
+        # including when the render fails
+        with tempfile.TemporaryDirectory(prefix="compose_", dir=_preferred_tmpdir()) as tmp:
+            tmp_dir = Path(tmp)
 
-        # Concatenate audio files
-        print("Concatenating audio files...")
-        full_audio = self.ffmpeg_builder.concatenate_audio(audio_files, video_dir)
+            # Background selection doesn't depend on the transcripts, so it runs
+            # alongside transcription; subtitles and character timings only need
+            # the transcripts and run together after
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                # Transcribe all audio files in parallel (before they're needed)
+                logger.info("Transcribing audio files for word-level timestamps...")
+                transcribe_future = executor.submit(
+                    self.transcriber.transcribe_all_audio_parallel, audio_files, TIMESTAMP_CACHE_DIR
+                )
+                # Get background video (randomly selected)
+                background_future = executor.submit(self.ffmpeg_builder.get_background_video)
 
-        # Create subtitle file with title sequence
-        # Use LLM-generated title from script
-        video_title = script["title"]
-        print("Creating subtitles...")
-        subtitle_file, timestamp_files = self.subtitle_generator.create_subtitle_file(
-            audio_files, video_dir, video_title
-        )
+                transcribe_future.result()
 
-        # Get total duration needed for the video
-        total_duration = get_audio_duration(full_audio)
-        print(f"Total duration: {total_duration:.2f} seconds")
+                # Create subtitle file with title sequence
+                logger.info("Creating subtitles...")
+                subtitles_future = executor.submit(
+                    self.subtitle_generator.create_subtitle_file,
+                    audio_files, work_dir, video_title, timestamp_dir=TIMESTAMP_CACHE_DIR
+                )
+                # Calculate character image timings (now dynamic for any characters)
+                logger.info("Calculating character image timings...")
+                timings_future = executor.submit(
+                    self.character_timing_calculator.calculate_image_timings,
+                    audio_files, TIMESTAMP_CACHE_DIR
+                )
 
-        # Calculate character image timings (now dynamic for any characters)
-        print("Calculating character image timings...")
-        character_image_times, character_image_paths = \
-            self.character_timing_calculator.calculate_image_timings(
-                audio_files, video_dir
+                background = background_future.result()
+                subtitle_file, _ = subtitles_future.result()
+                character_image_times, character_image_paths = timings_future.result()
+
+            logger.info(f"Using background: {background.name}")
+            # Reuse a copy already at the output size so the render skips scaling
+            background = self.ffmpeg_builder.get_or_build_bg_cache(background)
+            background_prescaled = background.parent == BACKGROUND_CACHE_DIR
+
+            # Get total duration needed for the video from the clip durations
+            # (already probed for the subtitles, so no extra FFprobe runs)
+            total_duration = sum(get_audio_duration(Path(a["audio_path"])) for a in audio_files)
+            logger.info(f"Total duration: {total_duration:.2f} seconds")
+
+            # Calculate random start time for background
+            random_start = self.ffmpeg_builder.calculate_background_start_time(
+                background, total_duration
             )
+            logger.info(f"Starting background at: {random_start:.2f} seconds")
 
-        # Calculate random start time for background
-        random_start = self.ffmpeg_builder.calculate_background_start_time(
-            background, total_duration
-        )
-        print(f"Starting background at: {random_start:.2f} seconds")
-
-        # Extract character group name from script cache key
-        # Cache key format: {job_description}|{character_group_name}|{template_name}
-        character_group_name = None
-        if "_cache_key" in script:
-            cache_key_parts = script["_cache_key"].split("|")
-            if len(cache_key_parts) >= 2:
-                character_group_name = cache_key_parts[1]
+            # Extract character group name from script cache key
+            # Cache key format: {job_description}|{character_group_name}|{template_name}
+            character_group_name = None
+            if "_cache_key" in script:
+                cache_key_parts = script["_cache_key"].split("|")
+                if len(cache_key_parts) >= 2:
+                    character_group_name = cache_key_parts[1]
         
-        # Build FFmpeg filter complex (now handles dynamic characters)
-        print("Building FFmpeg filter complex...")
-        filter_complex = self.ffmpeg_builder.build_filter_complex(
-            subtitle_file,
-            character_image_times,
-            character_image_paths,
-            audio_files=audio_files,
-            character_group_name=character_group_name
-        )
+            # Build FFmpeg filter complex (now handles dynamic characters)
+            logger.info("Building FFmpeg filter complex...")
+            simple_vf, filter_complex = self.ffmpeg_builder.build_filter_complex(
+                subtitle_file,
+                character_image_times,
+                character_image_paths,
+                audio_files=audio_files,
+                character_group_name=character_group_name,
+                by_character=by_character or index_audio_files(audio_files),
+                background_prescaled=background_prescaled,
+                sprite_dir=work_dir / "sprites",
+                # HLS takes its poster frame (1s in) from the main render
+                poster_time=1.0 if output_format == "hls" else None
+            )
 
-        # Build FFmpeg command based on output format
-        filter_file = video_dir / "filter_complex.txt"
-        filter_file.write_text(filter_complex, encoding='utf-8')
+            # Build FFmpeg command based on output format
+            filter_file = None
+            if simple_vf:
+                # Single linear chain on the background input
+                filter_args = ['-vf', simple_vf]
+                video_map = '0:v'
+            else:
+                # Pass the graph as a script file: no argument-length limits
+                filter_file = self.ffmpeg_builder.write_filter_script(
+                    filter_complex, work_dir / "filter_complex.txt"
+                )
+                filter_args = ['-filter_complex_script', str(filter_file)]
+                video_map = '[v]'
         
-        if output_format == "hls":
-            # Build HLS output command
-            from video.hls_builder import build_hls_output, create_master_playlist, generate_poster_image
-            hls_cmd, rendition_playlist = build_hls_output(
-                background,
-                full_audio,
-                filter_complex,
-                filter_file,
-                random_start,
-                total_duration,
-                video_dir,
-                title=video_title
-            )
-            cmd = hls_cmd
-            render_type = "HLS"
-            playlist_path = rendition_playlist
-        else:
-            # Build MP4 output command
-            mp4_output = video_dir / f"{output_name}.mp4"
-            cmd = [
-                'ffmpeg',
-                '-ss', str(random_start),
-                '-stream_loop', '-1',
-                '-i', str(background),
-                '-i', str(full_audio),
-                '-filter_complex_script', str(filter_file),
-                '-map', '[v]',
-                '-map', '1:a',
-                '-shortest',
-                # Video encoding: H.264
-                '-c:v', 'libx264',
-                '-profile:v', 'high',
-                '-preset', 'medium',
-                '-crf', '23',
-                # Audio encoding: AAC
-                '-c:a', 'aac',
-                '-b:a', '128k',
-                '-ar', '44100',
-                '-ac', '2',
-                '-y',
-                str(mp4_output)
-            ]
-            render_type = "MP4"
-            playlist_path = mp4_output
-
-        # Run FFmpeg with progress reporting
-        from config import VIDEO_WIDTH, VIDEO_HEIGHT, VIDEO_FPS
-        print(f"Rendering {render_type} video...")
-        print(f"  Resolution: {VIDEO_WIDTH}x{VIDEO_HEIGHT} @ {VIDEO_FPS}fps")
-        print(f"  Duration: {total_duration:.1f}s")
-        if output_format == "hls":
-            print(f"  Segment duration: 2.0s")
-        print(f"  Estimated render time: {total_duration * 0.3:.1f}s - {total_duration * 0.6:.1f}s")
-        print("  (Progress indicators will appear from FFmpeg)")
+            if output_format == "hls":
+                # Build HLS output command
+                from video.hls_builder import build_hls_output, create_master_playlist, generate_poster_image
+                hls_cmd, rendition_playlist = build_hls_output(
+                    background,
+                    'pipe:0',
+                    filter_args,
+                    video_map,
+                    random_start,
+                    total_duration,
+                    staging_dir,
+                    title=video_title,
+                    poster_path=staging_dir / "poster.jpg"
+                )
+                cmd = hls_cmd
+                render_type = "HLS"
+                playlist_path = rendition_playlist
+            else:
+                # Build MP4 output command
+                mp4_output = staging_dir / f"{output_name}.mp4"
+                cmd = [
+                    'ffmpeg',
+                    '-filter_threads', FILTER_THREADS,
+                    '-filter_complex_threads', FILTER_THREADS,
+                    '-ss', str(random_start),
+                    '-stream_loop', '-1',
+                    '-i', str(background),
+                    '-i', 'pipe:0',  # Concatenated audio streamed from FFmpeg
+                    *filter_args,
+                    '-map', video_map,
+                    '-map', '1:a',
+                    '-shortest',
+                    '-threads', '0',
+                    # Video encoding: H.264 (hardware encoder when available)
+                    *get_h264_encoder_args(crf=23),
+                    '-profile:v', 'high',
+                    # Audio encoding: AAC
+                    '-c:a', 'aac',
+                    '-b:a', '128k',
+                    '-ar', '44100',
+                    '-ac', '2',
+                    '-y',
+                    str(mp4_output)
+                ]
+                render_type = "MP4"
+                playlist_path = mp4_output
+
+            # Run FFmpeg with progress reporting
+            from config import VIDEO_WIDTH, VIDEO_HEIGHT, VIDEO_FPS
+            logger.info(f"Rendering {render_type} video...")
+            logger.info(f"  Resolution: {VIDEO_WIDTH}x{VIDEO_HEIGHT} @ {VIDEO_FPS}fps")
+            logger.info(f"  Duration: {total_duration:.1f}s")
+            if output_format == "hls":
+                logger.info("  Segment duration: 2.0s")
+            logger.info(f"  Estimated render time: {total_duration * 0.3:.1f}s - {total_duration * 0.6:.1f}s")
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+            # Concatenate audio files straight into the render's stdin
+            logger.info("Concatenating audio files...")
+            audio_proc = self.ffmpeg_builder.concatenate_audio(audio_files, tmp_dir)
+            try:
+                returncode, stderr_tail = run_ffmpeg_with_progress(
+                    cmd, total_duration, stdin=audio_proc.stdout
+                )
+            finally:
+                # run_ffmpeg_with_progress closes our read end as soon as the
+                # render has it (so the concat gets SIGPIPE when the render
+                # exits); closing again here is a no-op that covers early errors
+                audio_proc.stdout.close()
+                # -shortest may stop reading before the audio ends
+                if audio_proc.poll() is None:
+                    audio_proc.kill()
+                audio_proc.wait()
         
-        if result.returncode != 0:
-            print(f"\nFFmpeg error: {result.stderr}")
-            # Save filter complex file for debugging if render failed
-            print(f"Filter complex saved to: {filter_file}")
-            filter_file_debug = filter_file.parent / f"filter_complex_error_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            filter_file.rename(filter_file_debug)
-            raise RuntimeError(f"FFmpeg failed with return code {result.returncode}")
+            if returncode != 0:
+                logger.error(f"FFmpeg error: {stderr_tail}")
+                if audio_proc.returncode > 0:
+                    logger.error(
+                        f"Audio concatenation failed with return code {audio_proc.returncode}: "
+                        f"{self.ffmpeg_builder.concat_error_tail(tmp_dir)}"
+                    )
+                # Save filter complex file for debugging if render failed
+                # (the work copy expires with its directory)
+                if filter_file is not None:
+                    filter_file_debug = staging_dir / f"filter_complex_error_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+                    shutil.copyfile(filter_file, filter_file_debug)
+                    logger.error(f"Filter complex saved to: {filter_file_debug}")
+                else:
+                    logger.error(f"Video filter: {simple_vf}")
+                raise RuntimeError(f"FFmpeg failed with return code {returncode}")
 
-        if output_format == "hls":
-            # Create master playlist and poster for HLS
-            from video.hls_builder import create_master_playlist, generate_poster_image
-            print("Creating master playlist...")
-            master_playlist = create_master_playlist(
-                video_dir,
-                playlist_path
-            )
-            print(f"Master playlist: {master_playlist}")
-
-            # Generate poster image from first segment
-            print("Generating poster image...")
-            first_segment = video_dir / "720p" / "seg_000.ts"
-            poster_path = video_dir / "poster.jpg"
-            if first_segment.exists():
-                generate_poster_image(first_segment, poster_path)
-                print(f"Poster image: {poster_path}")
-            else:
-                print(f"Warning: First segment not found, skipping poster generation")
+            if output_format == "hls":
+                # Create master playlist and poster for HLS
+                from video.hls_builder import create_master_playlist, generate_poster_image
+                logger.info("Creating master playlist...")
+                master_playlist = create_master_playlist(
+                    staging_dir,
+                    playlist_path
+                )
+                logger.info(f"Master playlist: {master_playlist}")
+
+                # The render wrote the poster; videos shorter than the poster
+                # time never reach that frame, so fall back to a separate pass
+                poster_path = staging_dir / "poster.jpg"
+                if not poster_path.exists():
+                    logger.info("Generating poster image...")
+                    generate_poster_image(playlist_path, poster_path)
+                logger.info(f"Poster image: {poster_path}")
             
-            final_path = master_playlist
-        else:
-            # MP4 output
-            final_path = playlist_path
-
-        # Clean up temporary files
-        print("Cleaning up temporary files...")
-        full_audio.unlink()
-        subtitle_file.unlink()
-        concat_file = video_dir / "concat_list.txt"
-        if concat_file.exists():
-            concat_file.unlink()
-        filter_file.unlink()
-
-        # Clean up timestamp cache files
-        for timestamp_file in timestamp_files:
-            if timestamp_file.exists():
-                timestamp_file.unlink()
-
-        print(f"[SUCCESS] {render_type} video generated successfully:")
-        print(f"  Output path: {final_path}")
+                final_path = master_playlist
+            else:
+                # MP4 output
+                final_path = playlist_path
+
+        _publish_render(staging_dir, video_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        final_path = video_dir / final_path.relative_to(staging_dir)
+        self._store_render(render_cache, video_dir, final_path, output_format)
+
+        logger.info(f"[SUCCESS] {render_type} video generated successfully:")
+        logger.info(f"  Output path: {final_path}")
         return final_path
 
 
@@ -254,10 +547,10 @@ if __name__ == "__main__":
         from config import CACHE_DIR
         topics = [d for d in CACHE_DIR.iterdir() if d.is_dir() and not d.name in ['scripts', 'audio']]
         if not topics:
-            print("No topics found in cache.")
+            logger.error("No topics found in cache.")
             sys.exit(1)
         topic = topics[0].name
-        print(f"Using topic: {topic}")
+        logger.info(f"Using topic: {topic}")
     
     # Get topic directories
     topic_dirs = get_topic_dirs(topic)
@@ -265,24 +558,30 @@ if __name__ == "__main__":
     # Load script
     script_path = topic_dirs['scripts'] / 'script.json'
     if not script_path.exists():
-        print(f"Error: No script found at {script_path}")
+        logger.error(f"Error: No script found at {script_path}")
         sys.exit(1)
     
     with open(script_path, 'r', encoding='utf-8') as f:
         script = json.load(f)
     
-    print(f"Loaded script with {len(script['lines'])} lines")
+    logger.info(f"Loaded script with {len(script['lines'])} lines")
     
     # Collect audio files (handle both old and new format)
+    # List the audio directory once instead of stat-ing every candidate
+    audio_dir = topic_dirs['audio']
+    existing = set()
+    if audio_dir.is_dir():
+        with os.scandir(audio_dir) as entries:
+            existing = {entry.name for entry in entries if entry.is_file()}
     audio_files = []
     for line_index, line in enumerate(script['lines']):
         character = line['character']
         
         # New format: text and images array
         if "text" in line and "images" in line:
-            audio_path = topic_dirs['audio'] / f"{character}_{line_index}.mp3"
-            if not audio_path.exists():
-                print(f"Error: Audio file not found: {audio_path}")
+            audio_path = audio_dir / f"{character}_{line_index}.mp3"
+            if audio_path.name not in existing:
+                logger.error(f"Error: Audio file not found: {audio_path}")
                 sys.exit(1)
             audio_files.append({
                 'character': character,
@@ -294,9 +593,9 @@ if __name__ == "__main__":
         elif "segments" in line:
             # Old format: segments (backward compatibility)
             for segment_index, segment in enumerate(line['segments']):
-                audio_path = topic_dirs['audio'] / f"{character}_{line_index}_{segment_index}.mp3"
-                if not audio_path.exists():
-                    print(f"Error: Audio file not found: {audio_path}")
+                audio_path = audio_dir / f"{character}_{line_index}_{segment_index}.mp3"
+                if audio_path.name not in existing:
+                    logger.error(f"Error: Audio file not found: {audio_path}")
                     sys.exit(1)
                 audio_files.append({
                     'character': character,
@@ -309,12 +608,12 @@ if __name__ == "__main__":
                 })
         else:
             # Old format: single audio per line
-            audio_path = topic_dirs['audio'] / f"{character}_{line_index}.mp3"
-            if not audio_path.exists():
+            audio_path = audio_dir / f"{character}_{line_index}.mp3"
+            if audio_path.name not in existing:
                 # Try old segment format as fallback
-                audio_path = topic_dirs['audio'] / f"{character}_{line_index}_0.mp3"
-                if not audio_path.exists():
-                    print(f"Error: Audio file not found: {audio_path}")
+                audio_path = audio_dir / f"{character}_{line_index}_0.mp3"
+                if audio_path.name not in existing:
+                    logger.error(f"Error: Audio file not found: {audio_path}")
                     sys.exit(1)
             audio_files.append({
                 'character': character,
@@ -324,13 +623,15 @@ if __name__ == "__main__":
                 'line_index': line_index
             })
     
-    print(f"Found {len(audio_files)} audio files")
+    logger.info(f"Found {len(audio_files)} audio files")
+    by_character = index_audio_files(audio_files)
+    logger.info(f"Characters: {', '.join(by_character)}")
     
     # Compose video
     composer = VideoComposerFFmpeg(topic=topic)
-    video_path = composer.compose_video(audio_files, script)
+    video_path = composer.compose_video(audio_files, script, by_character=by_character)
     
-    print(f"\n{'='*60}")
-    print(f"SUCCESS! Video generated:")
-    print(f"  {video_path}")
-    print(f"{'='*60}")
+    logger.info(f"{'='*60}")
+    logger.info("SUCCESS! Video generated:")
+    logger.info(f"  {video_path}")
+    logger.info(f"{'='*60}")
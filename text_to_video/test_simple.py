@@ -54,7 +54,8 @@ if __name__ == "__main__":
     print(f"          |-- poster.jpg")
     print(f"          `-- 720p/")
     print(f"              |-- index.m3u8")
-    print(f"              |-- seg_000.ts")
-    print(f"              |-- seg_001.ts")
+    print(f"              |-- init.mp4")
+    print(f"              |-- seg_000.m4s")
+    print(f"              |-- seg_001.m4s")
     print(f"              `-- ...")
     print(f"{'='*60}")
@@ -0,0 +1,25 @@
+"""File helpers shared by the image utilities."""
+import os
+
+# Write buffer for saved images, so large PNGs go out in few system calls
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+def replace_image(img, image_path, **params):
+    """
+    Save img over image_path: written to a temporary file beside it, then
+    renamed into place, so an interrupted save never leaves a truncated
+    image behind. The format follows image_path's extension.
+    """
+    from PIL import Image
+
+    image_path = str(image_path)
+    image_format = Image.registered_extensions().get(os.path.splitext(image_path)[1].lower(), 'PNG')
+    tmp_path = image_path + '.tmp'
+    try:
+        with open(tmp_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            img.save(f, image_format, **params)
+        os.replace(tmp_path, image_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Crop transparent edges off a PNG and flip it horizontally in a single decode/encode pass."""
+import logging
+import sys
+import os
+
+from PIL import Image
+
+if __package__:
+    from ._image_io import replace_image
+    from .crop_transparent_edges import find_crop_box
+else:
+    # Run as a script, with this directory on sys.path
+    from _image_io import replace_image
+    from crop_transparent_edges import find_crop_box
+
+logger = logging.getLogger(__name__)
+
+def crop_and_flip(image_path):
+    """
+    Crop and flip a single image file in place.
+    Running crop_transparent_edges.py then flip_image.py decodes and
+    re-encodes the PNG twice; this does both on one decoded image.
+    Returns True if the file was rewritten.
+    """
+    try:
+        img = Image.open(image_path)
+        bbox = find_crop_box(img)
+        if bbox is None:
+            logger.warning(f"Warning: {image_path} is completely transparent, skipping...")
+            return False
+        # Pillow's crop + transpose beats crop + NumPy flip_horizontal here:
+        # both run in C over the cropped region only, with no array export
+        flipped = img.crop(bbox).transpose(Image.FLIP_LEFT_RIGHT)
+        replace_image(flipped, image_path)
+    except Exception as e:
+        logger.error(f"Error processing {image_path}: {e}")
+        return False
+    logger.info(f"Cropped and flipped: {image_path} (saved {flipped.size[0]}x{flipped.size[1]})")
+    return True
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    
+    if len(sys.argv) != 2:
+        logger.error("Usage: python crop_and_flip.py <image_path>")
+        sys.exit(1)
+    
+    path = sys.argv[1]
+    
+    if not os.path.isfile(path) or not path.lower().endswith('.png'):
+        logger.error("Error: File must be a PNG image")
+        sys.exit(1)
+    if not crop_and_flip(path):
+        sys.exit(1)
@@ -1,22 +1,171 @@
 #!/usr/bin/env python3
 """Flip a PNG image horizontally (like turning a page)."""
 import sys
-from PIL import Image
 
-if len(sys.argv) != 2:
-    print("Usage: python flip_image.py <image_path>")
-    sys.exit(1)
-
-image_path = sys.argv[1]
+if __package__:
+    from ._image_io import replace_image
+else:
+    # Run as a script, with this directory on sys.path
+    from _image_io import replace_image
 
+# NumPy is optional - without it Pillow's transpose does the flip
 try:
-    img = Image.open(image_path)
-    flipped = img.transpose(Image.FLIP_LEFT_RIGHT)
-    
-    # Replace original file
-    flipped.save(image_path)
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# 8-bit modes whose pixels map one-to-one onto a NumPy array and back
+NUMPY_FLIP_MODES = ('L', 'LA', 'RGB', 'RGBA')
+
+# Word types spanning a whole LA/RGBA pixel, so the flip moves one element
+# per pixel instead of one per channel byte
+PIXEL_WORD_DTYPES = {2: 'uint16', 4: 'uint32'}
+
+# Same-mode, same-size images flip_all mirrors into one array per batch
+FLIP_BATCH_SIZE = 32
+
+# Decoded pixels flip_all holds across all pending batches before flushing
+FLIP_PENDING_BYTES = 256 * 1024 * 1024
+
+def _mirror_array(arr, channels, out=None):
+    """
+    Reverse the pixel columns of an image array, channels last, into out
+    (a new array by default); any leading axes (a stack of images) are kept.
+    """
+    if out is None:
+        out = np.empty_like(arr)
+    word = PIXEL_WORD_DTYPES.get(channels)
+    if word is not None:
+        # Whole pixels move as one word each, through a reversed-stride view
+        pixels = arr.view(word).reshape(arr.shape[:-1])
+        out.view(word).reshape(out.shape[:-1])[...] = pixels[..., ::-1]
+    elif channels == 1:
+        out[...] = arr[..., ::-1]
+    else:
+        out[...] = arr[..., ::-1, :]
+    return out
+
+def _from_flipped(flipped_arr, info):
+    """Image from a mirrored array, keeping the source image's info."""
+    from PIL import Image
+    flipped = Image.fromarray(flipped_arr)
+    flipped.info.update(info)
+    return flipped
+
+def flip_horizontal(img):
+    """Return a copy of img mirrored left to right."""
+    if NUMPY_AVAILABLE and img.mode in NUMPY_FLIP_MODES:
+        return _from_flipped(_mirror_array(np.asarray(img), len(img.getbands())), img.info)
+    from PIL import Image
+    return img.transpose(Image.FLIP_LEFT_RIGHT)
+
+def flip_image_raw(npy_path):
+    """
+    Mirror a (height, width[, channels]) .npy image in place through a
+    memory map, with no image codec involved. Returns True on success.
+    """
+    if not NUMPY_AVAILABLE:
+        print(f"Error: {npy_path}: NumPy is required to flip .npy images")
+        return False
+    try:
+        arr = np.load(npy_path, mmap_mode='r+')
+        # NumPy buffers the overlapping reversed view before writing it back
+        arr[:] = arr[:, ::-1]
+        arr.flush()
+    except Exception as e:
+        print(f"Error: {npy_path}: {e}")
+        return False
+    print(f"Flipped image saved to: {npy_path}")
+    return True
+
+def _save_flipped(image_path, flipped):
+    """Replace an image file with its flipped version; returns True on success."""
+    try:
+        replace_image(flipped, image_path)
+    except Exception as e:
+        print(f"Error: {image_path}: {e}")
+        return False
     print(f"Flipped image saved to: {image_path}")
-except Exception as e:
-    print(f"Error: {e}")
-    sys.exit(1)
+    return True
+
+def _flip_batch(batch):
+    """
+    Flip a list of (path, pixels, info) of one shape, mirroring every image
+    into a single preallocated array.
+    """
+    first = batch[0][1]
+    channels = first.shape[2] if first.ndim == 3 else 1
+    flipped_stack = np.empty((len(batch),) + first.shape, dtype=first.dtype)
+    for (_, arr, _), out in zip(batch, flipped_stack):
+        _mirror_array(arr, channels, out)
+    return sum(
+        _save_flipped(image_path, _from_flipped(flipped_arr, info))
+        for (image_path, _, info), flipped_arr in zip(batch, flipped_stack)
+    )
+
+def flip_all(image_paths):
+    """
+    Flip several image files in place in one process.
+    .npy files are flipped raw through flip_image_raw. Images sharing a mode
+    and size are grouped, up to FLIP_BATCH_SIZE at a time, and each group is
+    mirrored into one array. Every pending group is flushed once their pixels
+    reach FLIP_PENDING_BYTES, so memory does not grow with the input set.
+    Returns the number of files flipped.
+    """
+    # Imported here so usage errors and .npy-only runs never load Pillow
+    from PIL import Image
+    flipped_count = 0
+    batches = {}
+    pending_bytes = 0
+    for image_path in image_paths:
+        if str(image_path).endswith('.npy'):
+            flipped_count += flip_image_raw(image_path)
+            continue
+        try:
+            with Image.open(image_path) as img:
+                img.load()
+                if not (NUMPY_AVAILABLE and img.mode in NUMPY_FLIP_MODES):
+                    flipped = flip_horizontal(img)
+                else:
+                    flipped = None
+                    # Keep only the pixels and info, not the decoded image too
+                    key = (img.mode, img.size)
+                    arr = np.asarray(img)
+                    info = img.info
+        except Exception as e:
+            print(f"Error: {image_path}: {e}")
+            continue
+        if flipped is not None:
+            flipped_count += _save_flipped(image_path, flipped)
+            continue
+        batches.setdefault(key, []).append((image_path, arr, info))
+        pending_bytes += arr.nbytes
+        if len(batches[key]) == FLIP_BATCH_SIZE:
+            batch = batches.pop(key)
+            pending_bytes -= sum(entry[1].nbytes for entry in batch)
+            flipped_count += _flip_batch(batch)
+        elif pending_bytes >= FLIP_PENDING_BYTES:
+            for batch in batches.values():
+                flipped_count += _flip_batch(batch)
+            batches.clear()
+            pending_bytes = 0
+    for batch in batches.values():
+        flipped_count += _flip_batch(batch)
+    return flipped_count
+
+def flip(image_path):
+    """Flip one image file in place; returns True on success."""
+    return flip_all([image_path]) == 1
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python flip_image.py <image_path> [<image_path> ...]")
+        sys.exit(1)
+
+    image_paths = sys.argv[1:]
 
+    # Replace the original files
+    if flip_all(image_paths) < len(image_paths):
+        sys.exit(1)